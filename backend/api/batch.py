@@ -0,0 +1,123 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+
+from recipes.models import Favorite, ShoppingCart
+
+from .pagination import invalidate_counts
+from .shopping_list import change_shopping_lists, get_recipe_ingredients
+
+ADDED = 'added'
+ALREADY_ADDED = 'already_added'
+NOT_FOUND = 'not_found'
+NOT_ALLOWED = 'not_allowed'
+REMOVED = 'removed'
+NOT_ADDED = 'not_added'
+
+
+def lock_user(user):
+    list(type(user).objects.select_for_update().filter(
+        pk=user.pk
+    ).values_list('pk', flat=True))
+
+
+def relations_changed(model, user_id, target_ids, delta):
+    if not target_ids or model not in (Favorite, ShoppingCart):
+        return
+    invalidate_counts(f'user:{user_id}')
+    if model is ShoppingCart:
+        change_shopping_lists(
+            [user_id], get_recipe_ingredients(target_ids, delta))
+
+
+def add_in_bulk(user, model, field, targets, ids, excluded_ids=()):
+    with transaction.atomic():
+        lock_user(user)
+        found = dict(targets.filter(id__in=ids).annotate(
+            added=Exists(model.objects.filter(
+                user=user, **{field: OuterRef('pk')}
+            ))
+        ).values_list('id', 'added'))
+        candidates = [
+            target_id for target_id in ids
+            if target_id in found and target_id not in excluded_ids
+            and not found[target_id]
+        ]
+        inserted = set()
+        if candidates:
+            model.objects.bulk_create([
+                model(user=user, **{f'{field}_id': target_id})
+                for target_id in candidates
+            ], ignore_conflicts=True)
+            inserted = set(model.objects.filter(
+                user=user, **{f'{field}_id__in': candidates}
+            ).values_list(f'{field}_id', flat=True))
+            model.change_counters_in_bulk([
+                model(user=user, **{f'{field}_id': target_id})
+                for target_id in inserted
+            ], 1)
+            relations_changed(model, user.id, list(inserted), 1)
+    results = []
+    for target_id in ids:
+        if target_id not in found:
+            results.append({'id': target_id, 'status': NOT_FOUND})
+        elif target_id in excluded_ids:
+            results.append({'id': target_id, 'status': NOT_ALLOWED})
+        elif target_id in inserted:
+            results.append({'id': target_id, 'status': ADDED})
+        else:
+            results.append({'id': target_id, 'status': ALREADY_ADDED})
+    return results
+
+
+def remove_in_bulk(user, model, field, ids):
+    with transaction.atomic():
+        lock_user(user)
+        removed = dict(model.objects.filter(
+            user=user, **{f'{field}_id__in': ids}
+        ).values_list('id', f'{field}_id'))
+        if removed:
+            relations = model.objects.filter(id__in=removed)
+            relations.handled_in_bulk = True
+            relations.delete()
+            model.change_counters_in_bulk([
+                model(user=user, **{f'{field}_id': target_id})
+                for target_id in removed.values()
+            ], -1)
+            relations_changed(model, user.id, list(removed.values()), -1)
+    removed = set(removed.values())
+    return [
+        {'id': target_id,
+         'status': REMOVED if target_id in removed else NOT_ADDED}
+        for target_id in ids
+    ]
+
+
+def add_relation(user, model, field, target_id):
+    with transaction.atomic():
+        lock_user(user)
+        if not list(model._meta.get_field(field).related_model.objects.filter(
+            pk=target_id
+        ).select_for_update(no_key=True).values_list('pk', flat=True)):
+            return None, NOT_FOUND
+        try:
+            with transaction.atomic():
+                return model.objects.create(
+                    user=user, **{f'{field}_id': target_id}
+                ), ADDED
+        except IntegrityError:
+            return None, ALREADY_ADDED
+
+
+def remove_relation(user, model, field, target_id):
+    with transaction.atomic():
+        lock_user(user)
+        deleted, _ = model.objects.filter(
+            user=user, **{f'{field}_id': target_id}
+        ).delete()
+    if deleted:
+        return REMOVED
+    if model._meta.get_field(field).related_model.objects.filter(
+        pk=target_id
+    ).exists():
+        return NOT_ADDED
+    return NOT_FOUND
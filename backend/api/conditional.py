@@ -0,0 +1,64 @@
+import hashlib
+
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscribe
+
+
+def make_etag(*parts):
+    content = '|'.join(str(part) for part in parts).encode()
+    return f'"{hashlib.md5(content).hexdigest()}"'
+
+
+def user_subquery(model, aggregate, field='user'):
+    return Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(value=aggregate).values('value'),
+        output_field=IntegerField()
+    )
+
+
+def get_viewer_fingerprint(user):
+    if user.is_anonymous:
+        return None
+    return type(user).objects.filter(pk=user.pk).values_list(
+        user_subquery(Favorite, Count('id')),
+        user_subquery(Favorite, Max('id')),
+        user_subquery(ShoppingCart, Count('id')),
+        user_subquery(ShoppingCart, Max('id')),
+        user_subquery(Subscribe, Count('id')),
+        user_subquery(Subscribe, Max('id')),
+    ).first()
+
+
+def is_not_modified(request, etag, last_modified=None):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in (
+            tag.strip() for tag in if_none_match.split(',')
+        )
+    if last_modified is None or not request.user.is_anonymous:
+        return False
+    if_modified_since = parse_http_date_safe(
+        request.headers.get('If-Modified-Since', ''))
+    return (if_modified_since is not None
+            and int(last_modified.timestamp()) <= if_modified_since)
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def conditional_response(request, etag, get_data, last_modified=None):
+    if is_not_modified(request, etag, last_modified):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = get_data()
+    return set_validators(response, etag, last_modified)
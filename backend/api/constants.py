@@ -2,3 +2,12 @@ TRUE_FILTER_VALUE = 1
 FALSE_FILTER_VALUE = 0
 PAGE_SIZE_VALUE = 5
 MAX_PAGE_SIZE_VALUE = 20
+INGREDIENT_INDEX_TTL = 300
+TAG_CACHE_VERSION_KEY = 'tags:version'
+TAG_CACHE_TTL = 300
+RECIPE_CARD_CACHE_PREFIX = 'recipe-card'
+RECIPE_CARD_CACHE_TIMEOUT = 60 * 60
+COUNT_CACHE_PREFIX = 'pagination-count'
+COUNT_CACHE_TIMEOUT = 60
+MAX_BATCH_SIZE = 100
+SHOPPING_LIST_UPSERT_BATCH_SIZE = 500
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscribe
+
+User = get_user_model()
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscribe, 'following'),
+)
+
+
+def actual_count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField()
+    ), 0)
+
+
+def reconcile_counters(dry_run=False):
+    drift = {}
+    with transaction.atomic():
+        for model, counter, related_model, field in COUNTERS:
+            drifted = model.objects.alias(
+                actual=actual_count(related_model, field)
+            ).exclude(**{counter: F('actual')})
+            if dry_run:
+                drift[f'{model._meta.model_name}.{counter}'] = (
+                    drifted.count())
+                continue
+            drift[f'{model._meta.model_name}.{counter}'] = drifted.update(
+                **{counter: actual_count(related_model, field)}
+            )
+    return drift
@@ -1,52 +1,54 @@
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.exceptions import ValidationError
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Recipe, TagToRecipe
+from recipes.search import search_recipes
 
 from .constants import FALSE_FILTER_VALUE, TRUE_FILTER_VALUE
-
-
-class IngredientFilter(FilterSet):
-    name = filters.CharFilter(lookup_expr='istartswith')
-
-    class Meta:
-        model = Ingredient
-        fields = ('name',)
+from .pagination import KeysetPagination
+from .tag_cache import tag_cache
 
 
 class RecipeFilter(FilterSet):
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_cache.get_slug_choices,
+        method='filter_tags'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'search')
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(Exists(TagToRecipe.objects.filter(
+            recipe=OuterRef('pk'),
+            tag_id__in=tag_cache.get_ids(value)
+        )))
+
+    def filter_search(self, queryset, name, value):
+        if KeysetPagination.cursor_query_param in self.request.query_params:
+            raise ValidationError({name: [
+                'Поиск нельзя совмещать с постраничным выводом по курсору.'
+            ]})
+        return search_recipes(queryset, value)
 
     def filter_is_favorited(self, queryset, name, value):
-        user = self.request.user
-        if value == TRUE_FILTER_VALUE and not user.is_anonymous:
-            return queryset.filter(favorites__user=user)
-        elif value == FALSE_FILTER_VALUE and not user.is_anonymous:
-            excluded_favorited = (
-                recipe.name for recipe in queryset.filter(
-                    favorites__user=user)
-            )
-            return queryset.exclude(name__in=excluded_favorited)
-        return queryset
+        return self.filter_annotated_flag(queryset, name, value)
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
-        user = self.request.user
-        if value == TRUE_FILTER_VALUE and not user.is_anonymous:
-            return queryset.filter(shopping_carts__user=user)
-        elif value == FALSE_FILTER_VALUE and not user.is_anonymous:
-            excluded_shopping_cart = (
-                recipe.name for recipe in queryset.filter(
-                    shopping_carts__user=user)
-            )
-            return queryset.exclude(name__in=excluded_shopping_cart)
-        return queryset
+        return self.filter_annotated_flag(queryset, name, value)
+
+    def filter_annotated_flag(self, queryset, name, value):
+        if self.request.user.is_anonymous or value not in (
+            TRUE_FILTER_VALUE, FALSE_FILTER_VALUE
+        ):
+            return queryset
+        return queryset.filter(**{name: value == TRUE_FILTER_VALUE})
@@ -0,0 +1,64 @@
+import time
+from bisect import bisect_left
+from itertools import islice
+
+from recipes.models import Ingredient
+
+from .conditional import make_etag
+from .constants import INGREDIENT_INDEX_TTL
+
+
+class IngredientIndex:
+    def __init__(self, ttl=INGREDIENT_INDEX_TTL):
+        self.ttl = ttl
+        self.state = None
+
+    def invalidate(self):
+        self.state = None
+
+    def build(self):
+        ingredients = sorted(
+            Ingredient.objects.all(),
+            key=lambda ingredient: (
+                ingredient.name.casefold(), ingredient.measurement_unit
+            )
+        )
+        keys = [ingredient.name.casefold() for ingredient in ingredients]
+        etag = make_etag(*(
+            (ingredient.id, ingredient.name, ingredient.measurement_unit)
+            for ingredient in ingredients
+        ))
+        self.state = (time.monotonic(), keys, ingredients, etag)
+        return self.state
+
+    def get_state(self):
+        state = self.state
+        if state is None or time.monotonic() - state[0] > self.ttl:
+            state = self.build()
+        return state
+
+    def search(self, query=None, limit=None):
+        _, keys, ingredients, _ = self.get_state()
+        if not query:
+            return ingredients[:limit]
+        query = query.casefold()
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        result = ingredients[start:end][:limit]
+        substring_matches = (
+            ingredient for key, ingredient in zip(keys, ingredients)
+            if query in key and not key.startswith(query)
+        )
+        if limit is not None:
+            substring_matches = islice(
+                substring_matches, max(limit - len(result), 0))
+        result.extend(substring_matches)
+        return result
+
+    def get_etag(self):
+        return self.get_state()[3]
+
+
+ingredient_index = IngredientIndex()
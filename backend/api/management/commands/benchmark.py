@@ -0,0 +1,196 @@
+import json
+import os
+import statistics
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+BUDGETS_FILE = os.path.join(settings.BASE_DIR, 'benchmark_budgets.json')
+
+
+class QueryTimer:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class Command(BaseCommand):
+    help = ('Замеряет количество SQL-запросов, время ответа и размер '
+            'ответа основных эндпоинтов и сравнивает их с бюджетами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email пользователя-зрителя.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--budgets', default=BUDGETS_FILE)
+        parser.add_argument('--output', help='Файл для JSON-отчета.')
+        parser.add_argument('--no-fail', action='store_true',
+                            help='Не завершаться ошибкой при превышении.')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('Количество повторов должно быть больше 0.')
+        viewer = self.get_viewer(options['user'])
+        with open(options['budgets'], encoding='utf-8') as budgets_file:
+            budgets = json.load(budgets_file)
+        client = APIClient()
+        client.force_authenticate(viewer)
+        anonymous_client = APIClient()
+        results = []
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, url, anonymous in self.get_endpoints():
+                results.append(self.measure(
+                    name, url,
+                    anonymous_client if anonymous else client,
+                    options['repeat'],
+                    budgets.get(name, {})
+                ))
+        report = {
+            'vendor': connection.vendor,
+            'viewer': viewer.email,
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        report_json = json.dumps(report, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(report_json)
+        else:
+            self.stdout.write(report_json)
+        failed = [result['name'] for result in results if result['exceeded']]
+        if failed and not options['no_fail']:
+            raise CommandError(
+                f'Превышены бюджеты производительности: {", ".join(failed)}')
+        self.stderr.write(self.style.SUCCESS(
+            'Замеры завершены.' if not failed
+            else f'Превышены бюджеты: {", ".join(failed)}'))
+
+    def get_viewer(self, email):
+        if email:
+            viewer = User.objects.filter(email=email).first()
+        else:
+            viewer = User.objects.annotate(
+                carts=Count('shopping_carts')
+            ).order_by('-carts', 'id').first()
+        if viewer is None:
+            raise CommandError(
+                'Пользователь не найден. Заполните БД командой seed_dataset.')
+        return viewer
+
+    def get_endpoints(self):
+        recipe = Recipe.objects.only('id', 'name').first()
+        author = User.objects.order_by(
+            '-recipes_count', 'id').only('id').first()
+        tag_slugs = list(Tag.objects.values_list('slug', flat=True)[:2])
+        ingredient = Ingredient.objects.only('name').first()
+        endpoints = [
+            ('recipes-list', '/api/recipes/', False),
+            ('recipes-list-anonymous', '/api/recipes/', True),
+            ('recipes-list-max-page', '/api/recipes/?limit=20', False),
+            ('recipes-author', f'/api/recipes/?author={author.id}', False),
+            ('recipes-favorited', '/api/recipes/?is_favorited=1', False),
+            ('recipes-not-favorited', '/api/recipes/?is_favorited=0', False),
+            ('recipes-in-cart', '/api/recipes/?is_in_shopping_cart=1',
+             False),
+            ('recipes-not-in-cart', '/api/recipes/?is_in_shopping_cart=0',
+             False),
+            ('shopping-list', '/api/recipes/shopping_list/', False),
+            ('download-shopping-cart', '/api/recipes/download_shopping_cart/',
+             False),
+            ('subscriptions', '/api/users/subscriptions/?recipes_limit=3',
+             False),
+            ('users-list', '/api/users/', False),
+        ]
+        if tag_slugs:
+            tags_query = '&'.join(f'tags={slug}' for slug in tag_slugs)
+            endpoints.extend((
+                ('recipes-tags', f'/api/recipes/?{tags_query}', False),
+                ('recipes-tags-favorited',
+                 f'/api/recipes/?{tags_query}&is_favorited=1', False),
+                ('recipes-tags-not-favorited',
+                 f'/api/recipes/?{tags_query}&is_favorited=0', False),
+                ('recipes-tags-not-in-cart',
+                 f'/api/recipes/?{tags_query}&is_in_shopping_cart=0',
+                 False),
+                ('recipes-author-tags-not-favorited',
+                 f'/api/recipes/?author={author.id}&{tags_query}'
+                 f'&is_favorited=0', False),
+                ('recipes-favorited-in-cart',
+                 '/api/recipes/?is_favorited=1&is_in_shopping_cart=1',
+                 False),
+                ('recipes-not-favorited-not-in-cart',
+                 '/api/recipes/?is_favorited=0&is_in_shopping_cart=0',
+                 False),
+                ('recipes-tags-cursor',
+                 f'/api/recipes/?cursor=&{tags_query}&is_favorited=0',
+                 False),
+            ))
+        if recipe is not None:
+            endpoints.extend((
+                ('recipes-retrieve', f'/api/recipes/{recipe.id}/', False),
+                ('recipes-search',
+                 f'/api/recipes/?search={quote(recipe.name.split()[0])}',
+                 False),
+            ))
+        if ingredient is not None:
+            endpoints.append((
+                'ingredients-search',
+                f'/api/ingredients/?name={ingredient.name[:2]}',
+                False
+            ))
+        return endpoints
+
+    def measure(self, name, url, client, repeat, budget):
+        wall_times = []
+        sql_times = []
+        query_counts = []
+        for _ in range(repeat):
+            timer = QueryTimer()
+            started = time.perf_counter()
+            with connection.execute_wrapper(timer):
+                response = client.get(url)
+                if response.streaming:
+                    size = sum(
+                        len(chunk) for chunk in response.streaming_content)
+                else:
+                    size = len(response.content)
+            wall_times.append(time.perf_counter() - started)
+            sql_times.append(timer.duration)
+            query_counts.append(timer.count)
+        result = {
+            'name': name,
+            'url': url,
+            'status': response.status_code,
+            'queries': max(query_counts),
+            'queries_first': query_counts[0],
+            'queries_last': query_counts[-1],
+            'sql_ms': round(statistics.median(sql_times) * 1000, 2),
+            'wall_ms': round(statistics.median(wall_times) * 1000, 2),
+            'bytes': size,
+            'budget': budget,
+        }
+        result['exceeded'] = sorted(
+            metric for metric, limit in budget.items()
+            if result[metric] > limit
+        )
+        if response.status_code >= 400:
+            result['exceeded'].append('status')
+        return result
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.images import build_recipe_variants, needs_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создает уменьшенные копии изображений существующих рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Пересоздать уже существующие копии.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        built = failed = 0
+        recipes = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).only('id', 'image', 'image_variants').order_by('id')
+        for recipe in recipes.iterator():
+            if not options['force'] and not needs_variants(recipe):
+                continue
+            try:
+                build_recipe_variants(recipe.id, recipe.image.name)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(
+                    f'Рецепт {recipe.id}: не удалось обработать '
+                    f'{recipe.image.name}: {error}')
+                continue
+            built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Копии изображений созданы для {built} рецептов, '
+            f'ошибок: {failed} ({time.monotonic() - started:.1f} с).'))
@@ -1,23 +1,76 @@
 import csv
 import os
+import time
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
 from recipes.models import Ingredient
 
 
 class Command(BaseCommand):
+    help = 'Загружает ингредиенты из CSV-файла в БД.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.BASE_DIR, 'ingredients.csv'),
+            help='Путь к CSV-файлу с ингредиентами.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только подсчитать новые ингредиенты.')
+
     def handle(self, *args, **options):
-        with open(os.path.join(settings.BASE_DIR, 'ingredients.csv'),
-                  'r', encoding='utf-8') as csv_file:
-            reader = csv.reader(csv_file)
-            Ingredient.objects.all().delete()
-            for id, row in enumerate(reader, 1):
-                Ingredient.objects.create(
-                    id=id,
-                    name=row[0],
-                    measurement_unit=row[1]
-                )
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пакета должен быть больше 0.')
+        started = time.monotonic()
+        total = new = 0
+        try:
+            with open(options['path'], 'r', encoding='utf-8') as csv_file:
+                with transaction.atomic():
+                    for batch in self.read_batches(
+                        csv.reader(csv_file), options['batch_size']
+                    ):
+                        total += len(batch)
+                        new += self.import_batch(batch, options['dry_run'])
+                        self.stdout.write(
+                            f'Обработано строк: {total}, новых: {new} '
+                            f'({time.monotonic() - started:.1f} с)')
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть файл: {error}')
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f'Пробный запуск: будет добавлено {new} ингредиентов '
+                f'из {total}.'))
+            return
         self.stdout.write(self.style.SUCCESS(
-            'Данные из "ingredients.csv" загружены в БД'))
+            f'Данные из "{os.path.basename(options["path"])}" загружены '
+            f'в БД: добавлено {new} ингредиентов из {total} '
+            f'за {time.monotonic() - started:.1f} с.'))
+
+    def read_batches(self, reader, batch_size):
+        batch = {}
+        for line_number, row in enumerate(reader, 1):
+            if len(row) < 2 or not row[0].strip():
+                self.stderr.write(f'Строка {line_number} пропущена: {row}')
+                continue
+            batch[(row[0], row[1])] = None
+            if len(batch) >= batch_size:
+                yield list(batch)
+                batch = {}
+        if batch:
+            yield list(batch)
+
+    def import_batch(self, batch, dry_run):
+        existing = set(Ingredient.objects.filter(
+            name__in={name for name, _ in batch}
+        ).values_list('name', 'measurement_unit'))
+        new_keys = [key for key in batch if key not in existing]
+        if not dry_run:
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=name, measurement_unit=measurement_unit)
+                 for name, measurement_unit in new_keys],
+                ignore_conflicts=True
+            )
+        return len(new_keys)
@@ -0,0 +1,79 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from recipes.models import Recipe
+from recipes.storage import recipe_image_storage
+
+
+class Command(BaseCommand):
+    help = ('Удаляет файлы изображений рецептов, на которые '
+            'не ссылается ни один рецепт.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=60,
+            help='Не удалять файлы моложе указанного числа минут.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только подсчитать неиспользуемые файлы.')
+
+    def get_references(self):
+        images = Counter()
+        variants = Counter()
+        recipes = Recipe.objects.exclude(image='').exclude(
+            image__isnull=True
+        ).values_list('image', 'image_variants')
+        for image, image_variants in recipes.iterator():
+            images[image] += 1
+            for formats in image_variants.get('sizes', {}).values():
+                variants.update(formats.values())
+        return images, variants
+
+    def is_referenced(self, name):
+        return Recipe.objects.filter(
+            Q(image=name) | Q(image_variants__icontains=name)
+        ).exists()
+
+    def walk(self, directory):
+        directories, files = recipe_image_storage.listdir(directory)
+        for name in files:
+            yield f'{directory}{name}'
+        for name in directories:
+            yield from self.walk(f'{directory}{name}/')
+
+    def handle(self, *args, **options):
+        if options['min_age'] < 0:
+            raise CommandError('Возраст файлов не может быть отрицательным.')
+        started = time.monotonic()
+        root = Recipe._meta.get_field('image').upload_to
+        if not recipe_image_storage.exists(root):
+            self.stdout.write('Каталог изображений пуст.')
+            return
+        images, variants = self.get_references()
+        references = images + variants
+        threshold = timezone.now() - timedelta(minutes=options['min_age'])
+        kept = removed = freed = 0
+        for name in self.walk(root):
+            if references[name]:
+                kept += 1
+                continue
+            if recipe_image_storage.get_modified_time(name) > threshold:
+                continue
+            if self.is_referenced(name):
+                kept += 1
+                continue
+            removed += 1
+            freed += recipe_image_storage.size(name)
+            if not options['dry_run']:
+                recipe_image_storage.delete(name)
+        shared = sum(1 for count in images.values() if count > 1)
+        prefix = 'Пробный запуск: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}используется файлов: {kept} '
+            f'(общих для нескольких рецептов: {shared}), '
+            f'удалено: {removed} ({freed / 1024 / 1024:.1f} Мб) '
+            f'за {time.monotonic() - started:.1f} с.'))
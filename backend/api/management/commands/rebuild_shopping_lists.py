@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.shopping_list import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает списки покупок пользователей из их корзин.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, nargs='+', dest='user_ids',
+                            help='Пересобрать списки только этих '
+                                 'пользователей.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пакета должен быть больше 0.')
+        started = time.monotonic()
+        created = rebuild_shopping_lists(
+            options['user_ids'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересобраны: {created} позиций '
+            f'за {time.monotonic() - started:.1f} с.'))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики рецептов, избранного и подписчиков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только подсчитать расхождения.')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        drift = reconcile_counters(options['dry_run'])
+        for counter, total in drift.items():
+            self.stdout.write(f'{counter}: расхождений {total}')
+        result = ('Пробный запуск: найдено расхождений'
+                  if options['dry_run'] else 'Исправлено записей')
+        self.stdout.write(self.style.SUCCESS(
+            f'{result}: {sum(drift.values())} '
+            f'за {time.monotonic() - started:.1f} с.'))
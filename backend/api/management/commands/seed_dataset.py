@@ -0,0 +1,243 @@
+import random
+import time
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from api.counters import reconcile_counters
+from api.shopping_list import rebuild_shopping_lists
+from recipes.models import (Favorite, Ingredient, IngredientToRecipe, Recipe,
+                            ShoppingCart, Tag, TagToRecipe)
+from users.models import Subscribe
+
+User = get_user_model()
+
+DEFAULT_PASSWORD = 'seed-password'
+SYNTHETIC_INGREDIENTS = 500
+MAX_DRAWS_FACTOR = 20
+UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'по вкусу')
+
+
+class ZipfSampler:
+    def __init__(self, values, exponent, rng):
+        self.values = list(values)
+        self.rng = rng
+        self.rng.shuffle(self.values)
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(values) + 1)
+        ))
+
+    def sample(self, k):
+        return self.rng.choices(
+            self.values, cum_weights=self.cum_weights, k=k
+        )
+
+
+class Command(BaseCommand):
+    help = ('Генерирует синтетический набор данных для нагрузочного '
+            'тестирования.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--max-ingredients', type=int, default=12)
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--carts', type=int, default=20000)
+        parser.add_argument('--subscriptions', type=int, default=20000)
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Показатель распределения Ципфа.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['batch_size'] < 1:
+            raise CommandError(
+                'Количество пользователей и размер пакета '
+                'должны быть положительными.')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.zipf = options['zipf']
+        started = time.monotonic()
+        with transaction.atomic():
+            tag_ids = self.seed_tags(options['tags'])
+            ingredient_ids = self.seed_ingredients()
+            user_ids = self.seed_users(options['users'])
+        with transaction.atomic():
+            recipe_ids = self.seed_recipes(options['recipes'], user_ids)
+        with transaction.atomic():
+            self.seed_recipe_links(
+                recipe_ids, tag_ids, ingredient_ids,
+                options['max_ingredients'])
+        if recipe_ids:
+            with transaction.atomic():
+                self.seed_user_recipe_pairs(
+                    Favorite, options['favorites'], user_ids, recipe_ids)
+                self.seed_user_recipe_pairs(
+                    ShoppingCart, options['carts'], user_ids, recipe_ids)
+        with transaction.atomic():
+            self.seed_subscriptions(options['subscriptions'], user_ids)
+        reconcile_counters()
+        rebuild_shopping_lists()
+        self.stdout.write(self.style.SUCCESS(
+            f'Синтетические данные созданы за '
+            f'{time.monotonic() - started:.1f} с.'))
+
+    def report(self, model, count, started):
+        self.stdout.write(
+            f'{model._meta.verbose_name_plural}: {count} '
+            f'({time.monotonic() - started:.1f} с)')
+
+    def create_in_batches(self, model, objects, **kwargs):
+        created = 0
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                model.objects.bulk_create(batch, **kwargs)
+                created += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch, **kwargs)
+            created += len(batch)
+        return created
+
+    def max_id(self, model):
+        return model.objects.aggregate(Max('id'))['id__max'] or 0
+
+    def seed_tags(self, count):
+        started = time.monotonic()
+        existing = Tag.objects.count()
+        self.create_in_batches(Tag, (
+            Tag(
+                name=f'Тег {number}',
+                slug=f'seed-tag-{number}',
+                color=f'#{self.rng.randrange(16 ** 6):06x}',
+            ) for number in range(existing, count)
+        ), ignore_conflicts=True)
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        self.report(Tag, len(tag_ids), started)
+        return tag_ids
+
+    def seed_ingredients(self):
+        started = time.monotonic()
+        if not Ingredient.objects.exists():
+            self.create_in_batches(Ingredient, (
+                Ingredient(
+                    name=f'Ингредиент {number}',
+                    measurement_unit=self.rng.choice(UNITS),
+                ) for number in range(SYNTHETIC_INGREDIENTS)
+            ))
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        self.report(Ingredient, len(ingredient_ids), started)
+        return ingredient_ids
+
+    def seed_users(self, count):
+        started = time.monotonic()
+        last_id = self.max_id(User)
+        offset = last_id + 1
+        password = make_password(DEFAULT_PASSWORD)
+        self.create_in_batches(User, (
+            User(
+                username=f'seed_user_{number}',
+                email=f'seed_user_{number}@example.com',
+                first_name=f'Имя{number}',
+                last_name=f'Фамилия{number}',
+                password=password,
+            ) for number in range(offset, offset + count)
+        ))
+        user_ids = list(User.objects.filter(id__gt=last_id).order_by(
+            'id').values_list('id', flat=True))
+        self.report(User, len(user_ids), started)
+        return user_ids
+
+    def seed_recipes(self, count, user_ids):
+        started = time.monotonic()
+        authors = ZipfSampler(user_ids, self.zipf, self.rng)
+        last_id = self.max_id(Recipe)
+        offset = last_id + 1
+        author_ids = authors.sample(count)
+        self.create_in_batches(Recipe, (
+            Recipe(
+                name=f'Рецепт {offset + number}',
+                text=f'Описание рецепта {offset + number}.',
+                cooking_time=self.rng.randint(1, 180),
+                author_id=author_id,
+            ) for number, author_id in enumerate(author_ids)
+        ))
+        recipe_ids = list(Recipe.objects.filter(id__gt=last_id).values_list(
+            'id', flat=True))
+        self.report(Recipe, len(recipe_ids), started)
+        return recipe_ids
+
+    def seed_recipe_links(self, recipe_ids, tag_ids, ingredient_ids,
+                          max_ingredients):
+        started = time.monotonic()
+        max_ingredients = min(max_ingredients, len(ingredient_ids))
+        links = self.create_in_batches(IngredientToRecipe, (
+            IngredientToRecipe(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=self.rng.randint(1, 1000),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in self.rng.sample(
+                ingredient_ids, self.rng.randint(1, max_ingredients))
+        ))
+        self.report(IngredientToRecipe, links, started)
+        if not tag_ids:
+            return
+        started = time.monotonic()
+        links = self.create_in_batches(TagToRecipe, (
+            TagToRecipe(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.rng.sample(
+                tag_ids, self.rng.randint(1, min(3, len(tag_ids))))
+        ))
+        self.report(TagToRecipe, links, started)
+
+    def unique_pairs(self, count, left, right, allow_equal=True):
+        seen = set()
+        draws = 0
+        while len(seen) < count and draws < count * MAX_DRAWS_FACTOR:
+            pairs = zip(
+                left.sample(self.batch_size), right.sample(self.batch_size)
+            )
+            draws += self.batch_size
+            for pair in pairs:
+                if len(seen) >= count:
+                    break
+                if pair in seen or (not allow_equal and pair[0] == pair[1]):
+                    continue
+                seen.add(pair)
+                yield pair
+
+    def max_pairs(self, count, left_size, right_size):
+        return min(count, left_size * right_size // 2)
+
+    def seed_user_recipe_pairs(self, model, count, user_ids, recipe_ids):
+        started = time.monotonic()
+        count = self.max_pairs(count, len(user_ids), len(recipe_ids))
+        users = ZipfSampler(user_ids, self.zipf, self.rng)
+        recipes = ZipfSampler(recipe_ids, self.zipf, self.rng)
+        created = self.create_in_batches(model, (
+            model(user_id=user_id, recipe_id=recipe_id)
+            for user_id, recipe_id in self.unique_pairs(count, users, recipes)
+        ), ignore_conflicts=True)
+        self.report(model, created, started)
+
+    def seed_subscriptions(self, count, user_ids):
+        started = time.monotonic()
+        count = self.max_pairs(count, len(user_ids), len(user_ids) - 1)
+        followers = ZipfSampler(user_ids, self.zipf, self.rng)
+        authors = ZipfSampler(user_ids, self.zipf, self.rng)
+        created = self.create_in_batches(Subscribe, (
+            Subscribe(user_id=user_id, following_id=following_id)
+            for user_id, following_id in self.unique_pairs(
+                count, followers, authors, allow_equal=False)
+        ), ignore_conflicts=True)
+        self.report(Subscribe, created, started)
@@ -1,9 +1,138 @@
-from rest_framework.pagination import PageNumberPagination
+import hashlib
+import json
+import time
+from functools import partial
 
-from .constants import MAX_PAGE_SIZE_VALUE, PAGE_SIZE_VALUE
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from .constants import (COUNT_CACHE_PREFIX, COUNT_CACHE_TIMEOUT,
+                        MAX_PAGE_SIZE_VALUE, PAGE_SIZE_VALUE)
 
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = PAGE_SIZE_VALUE
     page_size_query_param = 'limit'
     max_page_size = MAX_PAGE_SIZE_VALUE
+
+
+class KeysetPagination(CursorPagination):
+    page_size = PAGE_SIZE_VALUE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE_VALUE
+    ordering = '-id'
+
+    def decode_cursor(self, request):
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        return super().decode_cursor(request)
+
+
+class OptionalKeysetPagination(StandardResultsSetPagination):
+    keyset_pagination_class = KeysetPagination
+
+    def uses_cursor(self, request):
+        return (self.keyset_pagination_class.cursor_query_param
+                in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_paginator = None
+        if self.uses_cursor(request):
+            self.keyset_paginator = self.keyset_pagination_class()
+            return self.keyset_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class SubscriptionKeysetPagination(KeysetPagination):
+    ordering = 'username'
+
+
+class SubscriptionPagination(OptionalKeysetPagination):
+    keyset_pagination_class = SubscriptionKeysetPagination
+
+
+def get_count_generation(scope):
+    return cache.get_or_set(
+        f'{COUNT_CACHE_PREFIX}:generation:{scope}', time.time_ns,
+        timeout=None)
+
+
+def invalidate_counts(scope='global'):
+    cache.delete(f'{COUNT_CACHE_PREFIX}:generation:{scope}')
+
+
+def estimate_count(queryset):
+    plan = json.loads(queryset.explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KnownCountPaginator(Paginator):
+    def __init__(self, *args, known_count, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.known_count = known_count
+
+    @property
+    def count(self):
+        return self.known_count
+
+
+class CachedCountPagination(OptionalKeysetPagination):
+    ignored_query_params = ('page', 'limit', 'format')
+    viewer_query_params = ()
+
+    def get_count_key(self, request):
+        params = sorted(
+            (key, sorted(values))
+            for key, values in request.query_params.lists()
+            if key not in self.ignored_query_params
+        )
+        generations = [get_count_generation('global')]
+        if any(key in self.viewer_query_params for key, _ in params):
+            generations.append(request.user.id)
+            generations.append(get_count_generation(
+                f'user:{request.user.id}'))
+        signature = json.dumps([params, generations])
+        return (f'{COUNT_CACHE_PREFIX}:'
+                f'{hashlib.md5(signature.encode()).hexdigest()}')
+
+    def count_queryset(self, queryset):
+        threshold = settings.PAGINATION_ESTIMATE_COUNT_THRESHOLD
+        if threshold and connections[
+            queryset.db
+        ].vendor == 'postgresql':
+            estimate = estimate_count(queryset)
+            if estimate > threshold:
+                return estimate
+        return queryset.count()
+
+    def get_count(self, queryset, request):
+        if getattr(self, 'count_request', None) is not request:
+            key = self.get_count_key(request)
+            count = cache.get(key)
+            if count is None:
+                count = self.count_queryset(queryset)
+                cache.set(key, count, timeout=COUNT_CACHE_TIMEOUT)
+            self.count_request = request
+            self.count_value = count
+        return self.count_value
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.uses_cursor(request):
+            self.django_paginator_class = partial(
+                KnownCountPaginator,
+                known_count=self.get_count(queryset, request)
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+
+class RecipePagination(CachedCountPagination):
+    viewer_query_params = ('is_favorited', 'is_in_shopping_cart')
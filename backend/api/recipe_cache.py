@@ -0,0 +1,71 @@
+from django.core.cache import cache
+
+from .constants import RECIPE_CARD_CACHE_PREFIX, RECIPE_CARD_CACHE_TIMEOUT
+
+
+class RecipeCardCache:
+    hits_key = f'{RECIPE_CARD_CACHE_PREFIX}:hits'
+    misses_key = f'{RECIPE_CARD_CACHE_PREFIX}:misses'
+
+    def card_key(self, recipe):
+        return (f'{RECIPE_CARD_CACHE_PREFIX}:{recipe.id}:'
+                f'{recipe.updated_at.timestamp():.6f}')
+
+    def get_many(self, recipes):
+        card_keys = {recipe.id: self.card_key(recipe) for recipe in recipes}
+        cached = cache.get_many(card_keys.values())
+        cards = {
+            recipe_id: cached[key] for recipe_id, key in card_keys.items()
+            if key in cached
+        }
+        self.count(self.hits_key, len(cards))
+        self.count(self.misses_key, len(card_keys) - len(cards))
+        return cards
+
+    def set_many(self, recipes, cards):
+        cache.set_many(
+            {self.card_key(recipe): cards[recipe.id] for recipe in recipes},
+            timeout=RECIPE_CARD_CACHE_TIMEOUT
+        )
+
+    def count(self, key, delta):
+        if delta:
+            cache.add(key, 0, timeout=None)
+            cache.incr(key, delta)
+
+    def get_stats(self):
+        stats = cache.get_many((self.hits_key, self.misses_key))
+        hits = stats.get(self.hits_key, 0)
+        misses = stats.get(self.misses_key, 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+
+
+def make_card(data):
+    card = dict(data)
+    card['author'] = dict(card['author'], is_subscribed=None)
+    card['is_favorited'] = None
+    card['is_in_shopping_cart'] = None
+    return card
+
+
+def apply_viewer_fields(card, recipe, followed_ids, request):
+    card['author']['is_subscribed'] = card['author']['id'] in followed_ids
+    card['is_favorited'] = recipe.is_favorited
+    card['is_in_shopping_cart'] = recipe.is_in_shopping_cart
+    if card['image']:
+        card['image'] = request.build_absolute_uri(card['image'])
+    card['image_variants'] = {
+        size: {
+            extension: request.build_absolute_uri(url)
+            for extension, url in formats.items()
+        } for size, formats in card['image_variants'].items()
+    }
+    return card
+
+
+recipe_card_cache = RecipeCardCache()
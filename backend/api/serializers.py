@@ -1,17 +1,32 @@
+import json
+
 from django.contrib.auth import get_user_model
-from django.db.models import F
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer
 from djoser.serializers import UserSerializer as BaseUserSerializer
-from rest_framework import fields, relations, serializers, status
+from rest_framework import fields, serializers, status
+from rest_framework.utils import html
 from rest_framework.validators import UniqueTogetherValidator
 
 from recipes import models
-from recipes.fields import Base64ImageField
+from recipes.fields import Base64ImageField, ImageVariantsField
 from users.models import Subscribe
 
+from .constants import MAX_BATCH_SIZE
+from .pagination import invalidate_counts
+from .shopping_list import change_recipe_ingredients
+
 User = get_user_model()
 
 
+def load_followed_ids(user):
+    if user.is_anonymous:
+        return set()
+    return set(Subscribe.objects.filter(user=user).values_list(
+        'following_id', flat=True))
+
+
 class UserCreateSerializer(BaseUserCreateSerializer):
 
     class Meta(BaseUserCreateSerializer.Meta):
@@ -46,13 +61,16 @@ class UserSerializer(BaseUserSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        if user.is_anonymous:
-            return False
-        return Subscribe.objects.filter(
-            user=user,
-            following=obj
-        ).exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return obj.id in self.get_followed_ids()
+
+    def get_followed_ids(self):
+        followed_ids = self.context.get('followed_ids')
+        if followed_ids is None:
+            followed_ids = load_followed_ids(self.context['request'].user)
+            self.context['followed_ids'] = followed_ids
+        return followed_ids
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -90,11 +108,28 @@ class IngredientToRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
+class IngredientInRecipeSerializer(serializers.ModelSerializer):
+    id = fields.ReadOnlyField(source='ingredient.id')
+    name = fields.ReadOnlyField(source='ingredient.name')
+    measurement_unit = fields.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = models.IngredientToRecipe
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
-    ingredients = fields.SerializerMethodField()
+    ingredients = IngredientInRecipeSerializer(
+        source='ingredienttorecipe_set',
+        many=True,
+        read_only=True
+    )
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
     is_favorited = fields.SerializerMethodField(read_only=True)
     is_in_shopping_cart = fields.SerializerMethodField(read_only=True)
 
@@ -102,29 +137,23 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         model = models.Recipe
         fields = (
             'id', 'author', 'tags',
-            'ingredients', 'image',
+            'ingredients', 'image', 'image_variants',
             'name', 'cooking_time',
             'is_favorited', 'is_in_shopping_cart',
             'text'
         )
 
-    def get_ingredients(self, obj):
-        recipe = obj
-        ingredients = recipe.ingredients.values(
-            'id',
-            'name',
-            'measurement_unit',
-            amount=F('ingredienttorecipe__amount')
-        )
-        return ingredients
-
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         if user.is_anonymous:
             return False
         return user.favorites.filter(recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if user.is_anonymous:
             return False
@@ -143,9 +172,8 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         allow_null=False
     )
     image = Base64ImageField()
-    tags = relations.PrimaryKeyRelatedField(
-        many=True,
-        queryset=models.Tag.objects.all(),
+    tags = fields.ListField(
+        child=fields.IntegerField(),
         required=True,
         allow_empty=False,
         allow_null=False
@@ -163,6 +191,22 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             )
         ]
 
+    def to_internal_value(self, data):
+        if html.is_html_input(data) and isinstance(
+            data.get('ingredients'), str
+        ):
+            try:
+                ingredients = json.loads(data['ingredients'])
+            except ValueError:
+                raise serializers.ValidationError(
+                    {'ingredients': ['Некорректный список ингредиентов.']}
+                )
+            tags = data.getlist('tags')
+            data = dict(data.dict(), ingredients=ingredients)
+            if tags:
+                data['tags'] = tags
+        return super().to_internal_value(data)
+
     def validate(self, data):
         if data.get('ingredients') is None or data.get('tags') is None:
             raise serializers.ValidationError(
@@ -172,41 +216,47 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         return data
 
     def validate_tags(self, value):
-        tags = value
-        used_tags = []
-        for tag in tags:
-            if tag in used_tags:
-                raise serializers.ValidationError(
-                    'Теги не должны повторяться для одного рецепта.'
-                )
-            used_tags.append(tag)
-        return value
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError(
+                'Теги не должны повторяться для одного рецепта.'
+            )
+        tags = models.Tag.objects.in_bulk(value)
+        if len(tags) != len(value):
+            raise serializers.ValidationError(
+                'Тег не существует.',
+                code=status.HTTP_400_BAD_REQUEST
+            )
+        return [tags[tag_id] for tag_id in value]
 
     def validate_ingredients(self, value):
-        ingredients = value
-        used_ingredients = []
-        for ingredient in ingredients:
-            if not models.Ingredient.objects.filter(
-                id=ingredient['id']
-            ).exists():
-                raise serializers.ValidationError(
-                    'Ингредиент не существует.',
-                    code=status.HTTP_400_BAD_REQUEST
-                )
-            elif ingredient['amount'] < 1:
-                raise serializers.ValidationError(
-                    'Количество ингредиента не может быть меньше одного.',
-                    code=status.HTTP_400_BAD_REQUEST
-                )
-            else:
-                if ingredient['id'] in used_ingredients:
-                    raise serializers.ValidationError(
-                        'Ингредиент в рецепте не может '
-                        'быть представлен более 1 раза.'
-                    )
-                used_ingredients.append(ingredient['id'])
+        ingredient_ids = {ingredient['id'] for ingredient in value}
+        if models.Ingredient.objects.filter(
+            id__in=ingredient_ids
+        ).count() != len(ingredient_ids):
+            raise serializers.ValidationError(
+                'Ингредиент не существует.',
+                code=status.HTTP_400_BAD_REQUEST
+            )
+        if any(ingredient['amount'] < 1 for ingredient in value):
+            raise serializers.ValidationError(
+                'Количество ингредиента не может быть меньше одного.',
+                code=status.HTTP_400_BAD_REQUEST
+            )
+        if len(ingredient_ids) != len(value):
+            raise serializers.ValidationError(
+                'Ингредиент в рецепте не может '
+                'быть представлен более 1 раза.'
+            )
         return value
 
+    def save(self, **kwargs):
+        try:
+            return super().save(**kwargs)
+        finally:
+            image = self.validated_data.get('image')
+            if image is not None:
+                image.close()
+
     def creating_ingredients(self, recipe, ingredients):
         models.IngredientToRecipe.objects.bulk_create(
             [models.IngredientToRecipe(
@@ -215,30 +265,90 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
                 recipe=recipe) for ingredient in ingredients]
         )
 
+    def creating_tags(self, recipe, tags):
+        models.TagToRecipe.objects.bulk_create(
+            [models.TagToRecipe(tag=tag, recipe=recipe) for tag in tags]
+        )
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = models.Recipe.objects.create(**validated_data)
         self.creating_ingredients(recipe, ingredients)
-        models.TagToRecipe.objects.bulk_create(
-            [models.TagToRecipe(
-                tag=models.Tag.objects.get(id=tag.id),
-                recipe=recipe) for tag in tags]
-        )
+        self.creating_tags(recipe, tags)
         return recipe
 
+    def updating_tags(self, recipe, tags):
+        current = set(models.TagToRecipe.objects.filter(
+            recipe=recipe
+        ).values_list('tag_id', flat=True))
+        submitted = {tag.id: tag for tag in tags}
+        if current == set(submitted):
+            return
+        removed = current - set(submitted)
+        if removed:
+            models.TagToRecipe.objects.filter(
+                recipe=recipe, tag_id__in=removed
+            ).delete()
+        self.creating_tags(recipe, [
+            tag for tag_id, tag in submitted.items() if tag_id not in current
+        ])
+        transaction.on_commit(invalidate_counts)
+
+    def updating_ingredients(self, recipe, ingredients):
+        current = {
+            row.ingredient_id: row
+            for row in models.IngredientToRecipe.objects.filter(recipe=recipe)
+        }
+        submitted = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = [
+            row.id for ingredient_id, row in current.items()
+            if ingredient_id not in submitted
+        ]
+        if removed:
+            models.IngredientToRecipe.objects.filter(id__in=removed).delete()
+        changed = []
+        deltas = {}
+        for ingredient_id, row in current.items():
+            amount = submitted.get(ingredient_id, row.amount)
+            if row.amount != amount:
+                deltas[ingredient_id] = amount - row.amount
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            models.IngredientToRecipe.objects.bulk_update(changed, ['amount'])
+        added = [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in submitted.items()
+            if ingredient_id not in current
+        ]
+        self.creating_ingredients(recipe, added)
+        deltas.update(
+            (ingredient['id'], ingredient['amount']) for ingredient in added
+        )
+        change_recipe_ingredients(recipe.id, deltas)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        instance.tags.clear()
-        instance.tags.set(tags)
-        ingredients = validated_data.pop('ingredients')
-        instance.ingredients.clear()
-        self.creating_ingredients(instance, ingredients)
-        instance = super().update(instance, validated_data)
-        return instance
+        self.updating_tags(instance, validated_data.pop('tags'))
+        self.updating_ingredients(instance, validated_data.pop('ingredients'))
+        return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         request = self.context['request']
+        prefetch_related_objects(
+            [instance],
+            Prefetch(
+                'ingredienttorecipe_set',
+                queryset=models.IngredientToRecipe.objects.select_related(
+                    'ingredient')
+            ),
+            'tags'
+        )
         serializer = RecipeReadSerializer(
             instance,
             context={
@@ -249,10 +359,11 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
 
 
 class StandartRecipeSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = models.Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
 
 
@@ -300,7 +411,7 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
 
 class SubscribeReadSerializer(UserSerializer):
     recipes = fields.SerializerMethodField(read_only=True)
-    recipes_count = fields.SerializerMethodField(read_only=True)
+    recipes_count = fields.IntegerField(read_only=True)
 
     class Meta(UserSerializer.Meta):
         fields = UserSerializer.Meta.fields + (
@@ -310,6 +421,10 @@ class SubscribeReadSerializer(UserSerializer):
                             'first_name', 'last_name')
 
     def get_recipes(self, obj):
+        if hasattr(obj, 'latest_recipes'):
+            return StandartRecipeSerializer(
+                obj.latest_recipes, many=True, read_only=True
+            ).data
         recipes = obj.recipes.all()
         request = self.context['request']
         recipes_limit = request.query_params.get('recipes_limit')
@@ -320,9 +435,6 @@ class SubscribeReadSerializer(UserSerializer):
         )
         return serializer.data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class SubscribeWriteSerializer(serializers.ModelSerializer):
 
@@ -346,3 +458,27 @@ class SubscribeWriteSerializer(serializers.ModelSerializer):
             instance.following,
             context={'request': request}
         ).data
+
+
+class BatchSerializer(serializers.Serializer):
+    ids = fields.ListField(
+        child=fields.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BATCH_SIZE,
+        error_messages={
+            'max_length': 'Список не должен содержать больше '
+                          '{max_length} элементов.'
+        }
+    )
+
+
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    id = fields.ReadOnlyField(source='ingredient.id')
+    name = fields.ReadOnlyField(source='ingredient.name')
+    measurement_unit = fields.ReadOnlyField(
+        source='ingredient.measurement_unit')
+    amount = fields.ReadOnlyField(source='total_amount')
+
+    class Meta:
+        model = models.ShoppingListItem
+        fields = ('id', 'name', 'measurement_unit', 'amount')
@@ -0,0 +1,189 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+from collections import Counter
+
+from django.db import connections, router, transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from recipes.models import IngredientToRecipe, ShoppingCart, ShoppingListItem
+
+from .constants import SHOPPING_LIST_UPSERT_BATCH_SIZE
+
+SHOPPING_LIST_RENDERERS = {}
+
+
+def add_to_shopping_lists(user_ids, deltas):
+    connection = connections[router.db_for_write(ShoppingListItem)]
+    quote = connection.ops.quote_name
+    table = quote(ShoppingListItem._meta.db_table)
+    user, ingredient, total = (
+        quote(ShoppingListItem._meta.get_field(name).column)
+        for name in ('user', 'ingredient', 'total_amount')
+    )
+    rows = [
+        (user_id, ingredient_id, delta)
+        for user_id in user_ids
+        for ingredient_id, delta in deltas.items()
+    ]
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), SHOPPING_LIST_UPSERT_BATCH_SIZE):
+            batch = rows[start:start + SHOPPING_LIST_UPSERT_BATCH_SIZE]
+            cursor.execute(
+                f'INSERT INTO {table} ({user}, {ingredient}, {total}) '
+                f'VALUES {", ".join(["(%s, %s, %s)"] * len(batch))} '
+                f'ON CONFLICT ({user}, {ingredient}) DO UPDATE '
+                f'SET {total} = {table}.{total} + EXCLUDED.{total}',
+                [value for row in batch for value in row]
+            )
+
+
+def change_shopping_lists(user_ids, deltas):
+    additions = {
+        ingredient_id: delta for ingredient_id, delta in deltas.items()
+        if delta > 0
+    }
+    removals = {
+        ingredient_id: delta for ingredient_id, delta in deltas.items()
+        if delta < 0
+    }
+    if not user_ids:
+        return
+    if additions:
+        add_to_shopping_lists(user_ids, additions)
+    if removals:
+        items = ShoppingListItem.objects.filter(
+            user_id__in=user_ids, ingredient_id__in=removals
+        )
+        items.update(total_amount=Greatest(F('total_amount') + Case(
+            *(When(ingredient_id=ingredient_id, then=Value(delta))
+              for ingredient_id, delta in removals.items()),
+            output_field=IntegerField()
+        ), 0))
+        items.filter(total_amount=0).delete()
+
+
+def get_recipe_ingredients(recipe_ids, sign=1):
+    deltas = Counter()
+    for ingredient_id, amount in IngredientToRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('ingredient_id', 'amount'):
+        deltas[ingredient_id] += sign * amount
+    return deltas
+
+
+def change_recipe_ingredients(recipe_id, deltas):
+    if any(deltas.values()):
+        change_shopping_lists(list(ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True)), deltas)
+
+
+def rebuild_shopping_lists(user_ids=None, batch_size=1000):
+    items = ShoppingListItem.objects.all()
+    carts = {'recipe__shopping_carts__isnull': False}
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+        carts = {'recipe__shopping_carts__user_id__in': user_ids}
+    totals = IngredientToRecipe.objects.filter(**carts).values(
+        'recipe__shopping_carts__user_id', 'ingredient_id'
+    ).annotate(total=Sum('amount')).order_by()
+    created = 0
+    batch = []
+    with transaction.atomic():
+        items.delete()
+        for row in totals.iterator(chunk_size=batch_size):
+            batch.append(ShoppingListItem(
+                user_id=row['recipe__shopping_carts__user_id'],
+                ingredient_id=row['ingredient_id'],
+                total_amount=row['total']
+            ))
+            if len(batch) >= batch_size:
+                ShoppingListItem.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        ShoppingListItem.objects.bulk_create(batch)
+    return created + len(batch)
+
+
+def register_renderer(renderer_class):
+    SHOPPING_LIST_RENDERERS[renderer_class.format] = renderer_class
+    return renderer_class
+
+
+def get_renderer(format):
+    renderer_class = SHOPPING_LIST_RENDERERS.get(format)
+    return renderer_class() if renderer_class else None
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class BaseShoppingListRenderer(ABC):
+    format = None
+    content_type = None
+
+    @abstractmethod
+    def render(self, user, date, ingredients):
+        pass
+
+    def get_filename(self, user):
+        return (f'{user.first_name}_{user.last_name}'
+                f'_shopping_cart.{self.format}')
+
+
+@register_renderer
+class TextShoppingListRenderer(BaseShoppingListRenderer):
+    format = 'txt'
+    content_type = 'text/plain; charset=utf-8'
+
+    def render(self, user, date, ingredients):
+        yield (f'Список покупок: {user.first_name} {user.last_name}, '
+               f'{date.strftime("%d.%m.%Y")} \n\n')
+        for ingredient in ingredients:
+            yield (f'{ingredient["ingredient__name"]} '
+                   f'({ingredient["ingredient__measurement_unit"]}) '
+                   f'- {ingredient["ingredient_amount"]} \n')
+        yield f'\nFoodgram {date.year}'
+
+
+@register_renderer
+class CsvShoppingListRenderer(BaseShoppingListRenderer):
+    format = 'csv'
+    content_type = 'text/csv; charset=utf-8'
+
+    def render(self, user, date, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('Ингредиент', 'Единица измерения',
+                               'Количество'))
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['ingredient__name'],
+                ingredient['ingredient__measurement_unit'],
+                ingredient['ingredient_amount'],
+            ))
+
+
+@register_renderer
+class JsonShoppingListRenderer(BaseShoppingListRenderer):
+    format = 'json'
+    content_type = 'application/json'
+
+    def render(self, user, date, ingredients):
+        user_name = json.dumps(
+            f'{user.first_name} {user.last_name}', ensure_ascii=False)
+        yield (f'{{"user": {user_name}, "date": "{date.isoformat()}", '
+               f'"ingredients": [')
+        separator = ''
+        for ingredient in ingredients:
+            yield separator + json.dumps({
+                'name': ingredient['ingredient__name'],
+                'measurement_unit': ingredient[
+                    'ingredient__measurement_unit'],
+                'amount': ingredient['ingredient_amount'],
+            }, ensure_ascii=False)
+            separator = ', '
+        yield ']}'
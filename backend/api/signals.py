@@ -0,0 +1,176 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_migrate,
+                                      post_save, pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from recipes.images import needs_variants, schedule_variants
+from recipes.models import (Favorite, Ingredient, IngredientToRecipe, Recipe,
+                            ShoppingCart, Tag, TagToRecipe)
+from recipes.search import ensure_search_triggers
+from users.models import Subscribe
+
+from .batch import relations_changed
+from .ingredient_index import ingredient_index
+from .pagination import invalidate_counts
+from .shopping_list import (change_recipe_ingredients, change_shopping_lists,
+                            get_recipe_ingredients)
+from .tag_cache import tag_cache
+
+User = get_user_model()
+
+AUTHOR_CARD_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tag_cache_version(sender, **kwargs):
+    tag_cache.bump_version()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tagged_recipes(sender, instance, created=False, **kwargs):
+    if not created:
+        Recipe.objects.filter(tags=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_with_ingredient(sender, instance, created=False, **kwargs):
+    if not created:
+        Recipe.objects.filter(ingredients=instance).update(
+            updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_recipe_image_variants(sender, instance, **kwargs):
+    if needs_variants(instance):
+        transaction.on_commit(lambda: schedule_variants(instance))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipe_counts(sender, **kwargs):
+    invalidate_counts()
+
+
+def is_deleted_with_recipe(instance, origin):
+    return getattr(instance, 'recipe_id', None) in getattr(
+        origin, 'deleted_recipe_ids', ())
+
+
+def is_handled_by_origin(instance, origin):
+    return (getattr(origin, 'handled_in_bulk', False)
+            or is_deleted_with_recipe(instance, origin))
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_deleted_recipe_from_shopping_lists(sender, instance, origin=None,
+                                              **kwargs):
+    if origin is None:
+        return
+    origin.deleted_recipe_ids = getattr(
+        origin, 'deleted_recipe_ids', set()) | {instance.id}
+    change_shopping_lists(
+        list(ShoppingCart.objects.filter(recipe=instance).values_list(
+            'user_id', flat=True)),
+        get_recipe_ingredients([instance.id], -1)
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscribe)
+def decrement_counters(sender, instance, origin=None, **kwargs):
+    if not is_handled_by_origin(instance, origin):
+        instance.change_counters(-1)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def relation_added(sender, instance, created, **kwargs):
+    if created:
+        relations_changed(sender, instance.user_id, [instance.recipe_id], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def relation_removed(sender, instance, origin=None, **kwargs):
+    if not is_handled_by_origin(instance, origin):
+        relations_changed(sender, instance.user_id, [instance.recipe_id], -1)
+
+
+@receiver((post_save, post_delete), sender=TagToRecipe)
+def invalidate_counts_on_recipe_tags(sender, **kwargs):
+    invalidate_counts()
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_changed_recipes(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    invalidate_counts()
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        recipes = Recipe.objects.filter(pk=instance.pk)
+    elif pk_set:
+        recipes = Recipe.objects.filter(pk__in=pk_set)
+    elif sender is TagToRecipe:
+        recipes = Recipe.objects.filter(tags=instance)
+    else:
+        recipes = Recipe.objects.filter(ingredients=instance)
+    recipes.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipe_cards(sender, instance, created, update_fields,
+                                   **kwargs):
+    if created or (update_fields and not AUTHOR_CARD_FIELDS & set(
+        update_fields
+    )):
+        return
+    instance.recipes.update(updated_at=timezone.now())
+
+
+@receiver(pre_save, sender=IngredientToRecipe)
+def remember_recipe_ingredient(sender, instance, **kwargs):
+    instance.previous_ingredient = None
+    if instance.pk is not None:
+        instance.previous_ingredient = IngredientToRecipe.objects.filter(
+            pk=instance.pk
+        ).values_list('recipe_id', 'ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=IngredientToRecipe)
+def update_shopping_lists_on_ingredient_save(sender, instance, **kwargs):
+    deltas = Counter({instance.ingredient_id: instance.amount})
+    if instance.previous_ingredient is not None:
+        recipe_id, ingredient_id, amount = instance.previous_ingredient
+        if recipe_id == instance.recipe_id:
+            deltas[ingredient_id] -= amount
+        else:
+            change_recipe_ingredients(recipe_id, {ingredient_id: -amount})
+    change_recipe_ingredients(instance.recipe_id, deltas)
+
+
+@receiver(post_delete, sender=IngredientToRecipe)
+def update_shopping_lists_on_ingredient_delete(sender, instance, origin=None,
+                                               **kwargs):
+    if not is_deleted_with_recipe(instance, origin):
+        change_recipe_ingredients(
+            instance.recipe_id, {instance.ingredient_id: -instance.amount})
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.name == 'recipes':
+        ensure_search_triggers(connections[using])
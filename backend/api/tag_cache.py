@@ -0,0 +1,63 @@
+import hashlib
+import json
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+
+from recipes.models import Tag
+
+from .constants import TAG_CACHE_TTL, TAG_CACHE_VERSION_KEY
+from .serializers import TagSerializer
+
+TagCacheState = namedtuple(
+    'TagCacheState',
+    ('built_at', 'version', 'data', 'ids_by_slug', 'etag')
+)
+
+
+class TagCache:
+    def __init__(self, ttl=TAG_CACHE_TTL):
+        self.ttl = ttl
+        self.state = None
+
+    def get_version(self):
+        return cache.get_or_set(
+            TAG_CACHE_VERSION_KEY, time.time_ns, timeout=None)
+
+    def bump_version(self):
+        try:
+            cache.incr(TAG_CACHE_VERSION_KEY)
+        except ValueError:
+            cache.set(TAG_CACHE_VERSION_KEY, time.time_ns(), timeout=None)
+
+    def build(self, version):
+        tags = list(Tag.objects.all())
+        data = TagSerializer(tags, many=True).data
+        content = json.dumps(data, ensure_ascii=False).encode()
+        self.state = TagCacheState(
+            built_at=time.monotonic(),
+            version=version,
+            data=data,
+            ids_by_slug={tag.slug: tag.id for tag in tags},
+            etag=f'"{hashlib.md5(content).hexdigest()}"'
+        )
+        return self.state
+
+    def get(self):
+        version = self.get_version()
+        state = self.state
+        if (state is None or state.version != version
+                or time.monotonic() - state.built_at > self.ttl):
+            state = self.build(version)
+        return state
+
+    def get_slug_choices(self):
+        return [(slug, slug) for slug in self.get().ids_by_slug]
+
+    def get_ids(self, slugs):
+        ids_by_slug = self.get().ids_by_slug
+        return [ids_by_slug[slug] for slug in slugs if slug in ids_by_slug]
+
+
+tag_cache = TagCache()
@@ -0,0 +1,77 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, IngredientToRecipe, Recipe, Tag
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        email='user@foodgram.ru',
+        username='user',
+        first_name='Имя',
+        last_name='Фамилия',
+        password='Password-12345'
+    )
+
+
+@pytest.fixture
+def author(django_user_model):
+    return django_user_model.objects.create_user(
+        email='author@foodgram.ru',
+        username='author',
+        first_name='Имя',
+        last_name='Фамилия',
+        password='Password-12345'
+    )
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def tags():
+    return [
+        Tag.objects.create(name=f'Тег {i}', color=f'#00000{i}', slug=f'tag{i}')
+        for i in range(2)
+    ]
+
+
+@pytest.fixture
+def ingredients():
+    return [
+        Ingredient.objects.create(name=f'Ингредиент {i}', measurement_unit='г')
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def recipes(author, tags, ingredients):
+    recipes = []
+    for i in range(25):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {i}',
+            text='Описание',
+            cooking_time=10
+        )
+        recipe.tags.set(tags)
+        IngredientToRecipe.objects.bulk_create(
+            IngredientToRecipe(recipe=recipe, ingredient=ingredient,
+                               amount=i + j + 1)
+            for j, ingredient in enumerate(ingredients)
+        )
+        recipes.append(recipe)
+    return recipes
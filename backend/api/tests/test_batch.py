@@ -0,0 +1,66 @@
+import pytest
+
+from api.batch import (ADDED, ALREADY_ADDED, NOT_FOUND, add_in_bulk,
+                       add_relation)
+from recipes.models import Favorite, Recipe, ShoppingCart, ShoppingListItem
+
+CART_BATCH_DELETE_QUERIES = 10
+
+
+@pytest.mark.django_db
+def test_add_relation_checks_target_before_insert(user, recipes):
+    missing_id = Recipe.objects.order_by('-id').first().id + 1
+    assert add_relation(user, Favorite, 'recipe', missing_id) == (
+        None, NOT_FOUND
+    )
+    relation, result = add_relation(user, Favorite, 'recipe', recipes[0].id)
+    assert result == ADDED
+    assert add_relation(user, Favorite, 'recipe', recipes[0].id) == (
+        None, ALREADY_ADDED
+    )
+    assert Favorite.objects.filter(user=user).count() == 1
+    assert Recipe.objects.get(id=recipes[0].id).favorites_count == 1
+
+
+@pytest.mark.django_db
+def test_add_in_bulk_counts_only_inserted(user, recipes):
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    results = add_in_bulk(user, Favorite, 'recipe', Recipe.objects,
+                          [recipes[0].id, recipes[1].id])
+    assert [result['status'] for result in results] == [
+        ALREADY_ADDED, ADDED
+    ]
+    assert Recipe.objects.get(id=recipes[1].id).favorites_count == 1
+
+
+@pytest.mark.django_db
+def test_batch_add_skips_existing_relations(user_client, user, recipes):
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    ids = [recipes[0].id, recipes[1].id]
+    response = user_client.post(
+        '/api/recipes/favorite/', {'ids': ids}, format='json'
+    )
+    assert response.status_code == 200
+    assert [result['status'] for result in response.data['results']] == [
+        'already_added', 'added'
+    ]
+    assert Recipe.objects.get(id=recipes[0].id).favorites_count == 1
+    assert Recipe.objects.get(id=recipes[1].id).favorites_count == 1
+
+
+@pytest.mark.django_db
+def test_batch_cart_delete_queries(
+    user_client, user, recipes, django_assert_num_queries
+):
+    ids = [recipe.id for recipe in recipes[:20]]
+    user_client.post('/api/recipes/shopping_cart/', {'ids': ids},
+                     format='json')
+    assert ShoppingListItem.objects.filter(user=user).exists()
+    with django_assert_num_queries(CART_BATCH_DELETE_QUERIES):
+        response = user_client.delete(
+            '/api/recipes/shopping_cart/', {'ids': ids}, format='json'
+        )
+    assert response.status_code == 200
+    assert not ShoppingCart.objects.filter(user=user).exists()
+    assert not ShoppingListItem.objects.filter(user=user).exists()
+    assert not Recipe.objects.filter(in_carts_count__gt=0).exists()
@@ -0,0 +1,24 @@
+import pytest
+from django.utils import timezone
+
+from api.tag_cache import TagCache
+from recipes.models import Recipe, Tag
+
+
+@pytest.mark.django_db
+def test_tag_cache_expires_without_version_bump(tags):
+    tag_cache = TagCache(ttl=0)
+    assert tag_cache.get().ids_by_slug == {tag.slug: tag.id for tag in tags}
+    Tag.objects.filter(id=tags[0].id).update(slug='renamed')
+    assert 'renamed' in tag_cache.get().ids_by_slug
+
+
+@pytest.mark.django_db
+def test_recipe_card_cache_follows_updated_at(user_client, recipes):
+    recipe = recipes[0]
+    url = f'/api/recipes/{recipe.id}/'
+    assert user_client.get(url).data['name'] == recipe.name
+    Recipe.objects.filter(id=recipe.id).update(
+        name='Новое название', updated_at=timezone.now()
+    )
+    assert user_client.get(url).data['name'] == 'Новое название'
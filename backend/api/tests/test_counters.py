@@ -0,0 +1,98 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.shopping_list import change_shopping_lists, rebuild_shopping_lists
+from recipes.models import Favorite, Recipe, ShoppingCart, ShoppingListItem
+from users.models import Subscribe
+
+
+@pytest.mark.django_db
+def test_stale_recipe_save_keeps_counters(user, recipes):
+    stale = Recipe.objects.get(id=recipes[0].id)
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    ShoppingCart.objects.create(user=user, recipe=recipes[0])
+    stale.name = 'Новое название'
+    stale.save()
+    stale.refresh_from_db()
+    assert stale.name == 'Новое название'
+    assert stale.favorites_count == 1
+    assert stale.in_carts_count == 1
+
+
+@pytest.mark.django_db
+def test_stale_user_save_keeps_counters(django_user_model, user, author,
+                                        recipes):
+    stale = django_user_model.objects.get(id=author.id)
+    Subscribe.objects.create(user=user, following=author)
+    stale.set_password('New-password-12345')
+    stale.save()
+    stale.refresh_from_db()
+    assert stale.check_password('New-password-12345')
+    assert stale.followers_count == 1
+    assert stale.recipes_count == len(recipes)
+
+
+@pytest.mark.django_db
+def test_recipe_delete_queries_do_not_depend_on_relations(
+    django_user_model, author, recipes
+):
+    users = [
+        django_user_model.objects.create_user(
+            email=f'reader{i}@foodgram.ru', username=f'reader{i}',
+            first_name='Имя', last_name='Фамилия', password='Password-12345'
+        ) for i in range(3)
+    ]
+    for user in users:
+        Favorite.objects.create(user=user, recipe=recipes[1])
+        ShoppingCart.objects.create(user=user, recipe=recipes[1])
+        ShoppingCart.objects.create(user=user, recipe=recipes[2])
+    Favorite.objects.create(user=users[0], recipe=recipes[0])
+    ShoppingCart.objects.create(user=users[0], recipe=recipes[0])
+    rebuilt_shopping_lists()
+    query_counts = []
+    for recipe in recipes[:2]:
+        with CaptureQueriesContext(connection) as context:
+            recipe.delete()
+        query_counts.append(len(context.captured_queries))
+    assert query_counts[0] == query_counts[1]
+    assert ShoppingListItem.objects.exists()
+    rebuilt_shopping_lists()
+    assert Recipe.objects.get(id=recipes[2].id).in_carts_count == 3
+    author.refresh_from_db()
+    assert author.recipes_count == len(recipes) - 2
+
+
+@pytest.mark.django_db
+def test_rebuild_for_one_user_with_shared_recipe(user, author, recipes):
+    ShoppingCart.objects.create(user=user, recipe=recipes[0])
+    ShoppingCart.objects.create(user=author, recipe=recipes[0])
+    expected = current_shopping_lists()
+    rebuild_shopping_lists(user_ids=[user.id])
+    assert current_shopping_lists() == expected
+
+
+@pytest.mark.django_db
+def test_change_shopping_lists_adds_to_existing_rows(user, ingredients):
+    ShoppingListItem.objects.create(
+        user=user, ingredient=ingredients[0], total_amount=3)
+    change_shopping_lists([user.id], {ingredients[0].id: 2,
+                                      ingredients[1].id: 5})
+    assert current_shopping_lists() == {
+        (user.id, ingredients[0].id, 5), (user.id, ingredients[1].id, 5)
+    }
+    change_shopping_lists([user.id], {ingredients[0].id: -7})
+    assert current_shopping_lists() == {(user.id, ingredients[1].id, 5)}
+
+
+def current_shopping_lists():
+    return set(ShoppingListItem.objects.values_list(
+        'user_id', 'ingredient_id', 'total_amount'))
+
+
+def rebuilt_shopping_lists():
+    current = current_shopping_lists()
+    rebuild_shopping_lists()
+    rebuilt = current_shopping_lists()
+    assert rebuilt == current
+    return rebuilt
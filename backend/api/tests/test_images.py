@@ -0,0 +1,40 @@
+import os
+import time
+from collections import Counter
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+
+from api.management.commands.gc_recipe_images import Command
+from recipes.models import Recipe
+from recipes.storage import recipe_image_storage
+
+OLD = time.time() - 2 * 60 * 60
+
+
+@pytest.fixture
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path
+
+
+def test_duplicate_save_refreshes_blob_mtime(media):
+    name = recipe_image_storage.save(
+        'recipes/images/a.png', ContentFile(b'image'))
+    os.utime(recipe_image_storage.path(name), (OLD, OLD))
+    assert recipe_image_storage.save(
+        'recipes/images/b.png', ContentFile(b'image')) == name
+    assert os.path.getmtime(recipe_image_storage.path(name)) > OLD
+
+
+@pytest.mark.django_db
+def test_gc_rechecks_references_before_delete(media, monkeypatch, recipes):
+    name = recipe_image_storage.save(
+        'recipes/images/a.png', ContentFile(b'image'))
+    os.utime(recipe_image_storage.path(name), (OLD, OLD))
+    Recipe.objects.filter(id=recipes[0].id).update(image=name)
+    monkeypatch.setattr(
+        Command, 'get_references', lambda self: (Counter(), Counter()))
+    call_command('gc_recipe_images', min_age=60)
+    assert recipe_image_storage.exists(name)
@@ -0,0 +1,81 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+
+RECIPE_LIST_QUERIES = 7
+RECIPE_DETAIL_QUERIES = 5
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit', (5, 20))
+def test_recipe_list_queries_do_not_depend_on_page_size(
+    user_client, recipes, limit, django_assert_num_queries
+):
+    with django_assert_num_queries(RECIPE_LIST_QUERIES):
+        response = user_client.get(f'/api/recipes/?limit={limit}')
+    assert response.status_code == 200
+    assert len(response.data['results']) == limit
+
+
+@pytest.mark.django_db
+def test_recipe_detail_queries(
+    user_client, recipes, django_assert_num_queries
+):
+    recipe = recipes[0]
+    with django_assert_num_queries(RECIPE_DETAIL_QUERIES):
+        response = user_client.get(f'/api/recipes/{recipe.id}/')
+    assert response.status_code == 200
+    assert response.data['id'] == recipe.id
+
+
+@pytest.mark.django_db
+def test_shared_ingredient_amounts_are_per_recipe(
+    user_client, recipes, ingredients
+):
+    response = user_client.get('/api/recipes/?limit=20')
+    assert response.status_code == 200
+    expected = {
+        recipe.id: {
+            ingredient.id: index + position + 1
+            for position, ingredient in enumerate(ingredients)
+        } for index, recipe in enumerate(recipes)
+    }
+    for card in response.data['results']:
+        assert {
+            ingredient['id']: ingredient['amount']
+            for ingredient in card['ingredients']
+        } == expected[card['id']]
+    cache.clear()
+    detail = user_client.get(f'/api/recipes/{recipes[1].id}/').data
+    assert {
+        ingredient['id']: ingredient['amount']
+        for ingredient in detail['ingredients']
+    } == expected[recipes[1].id]
+
+
+@pytest.mark.django_db
+def test_recipe_list_etag_changes_on_delete_without_signals(
+    user_client, recipes
+):
+    response = user_client.get('/api/recipes/')
+    deleted_id = response.data['results'][1]['id']
+    with connection.cursor() as cursor:
+        for table, column in (('recipes_ingredienttorecipe', 'recipe_id'),
+                              ('recipes_tagtorecipe', 'recipe_id'),
+                              ('recipes_recipe', 'id')):
+            cursor.execute(
+                f'DELETE FROM {table} WHERE {column} = %s', [deleted_id])
+    response = user_client.get(
+        '/api/recipes/', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == 200
+    assert deleted_id not in [card['id'] for card in response.data['results']]
+
+
+@pytest.mark.django_db
+def test_recipe_search_rejects_cursor(user_client, recipes):
+    response = user_client.get('/api/recipes/?search=Рецепт')
+    assert response.status_code == 200
+    assert response.data['count'] == len(recipes)
+    response = user_client.get('/api/recipes/?search=Рецепт&cursor=')
+    assert response.status_code == 400
+    assert 'search' in response.data
@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window)
+from django.db.models.functions import RowNumber
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
@@ -13,12 +15,33 @@ from recipes import models
 from users.models import Subscribe
 
 from . import serializers
-from .filters import IngredientFilter, RecipeFilter
+from .batch import (ALREADY_ADDED, NOT_FOUND, REMOVED, add_in_bulk,
+                    add_relation, remove_in_bulk, remove_relation)
+from .conditional import (conditional_response, get_viewer_fingerprint,
+                          make_etag)
+from .filters import RecipeFilter
+from .ingredient_index import ingredient_index
+from .pagination import (RecipePagination, StandardResultsSetPagination,
+                         SubscriptionPagination)
 from .permissions import IsAuthenticatedOrAuthor
+from .recipe_cache import apply_viewer_fields, make_card, recipe_card_cache
+from .shopping_list import SHOPPING_LIST_RENDERERS, get_renderer
+from .tag_cache import tag_cache
 
 User = get_user_model()
 
 
+def not_found(model):
+    return Http404(
+        f'No {model._meta.object_name} matches the given query.')
+
+
+def get_batch_ids(request):
+    serializer = serializers.BatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    return list(dict.fromkeys(serializer.validated_data['ids']))
+
+
 class UserViewSet(BaseUserViewSet):
     queryset = User.objects.all()
     serializer_class = serializers.UserSerializer
@@ -27,24 +50,32 @@ class UserViewSet(BaseUserViewSet):
             methods=['post', 'delete'],
             permission_classes=[permissions.IsAuthenticated])
     def subscribe(self, request, **kwargs):
-        user = request.user
-        following = get_object_or_404(
-            User,
-            id=kwargs.get('id')
-        )
+        following_id = kwargs.get('id')
         if request.method == 'POST':
+            if str(request.user.id) == following_id:
+                return Response(
+                    data={'non_field_errors': [
+                        'Нельзя подписаться на самого себя.']},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            subscription, result = add_relation(
+                request.user, Subscribe, 'following', following_id)
+            if result == NOT_FOUND:
+                raise not_found(User)
+            if result == ALREADY_ADDED:
+                return Response(
+                    data={'non_field_errors': [
+                        'Вы уже подписаны на этого пользователя.']},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             serializer = serializers.SubscribeWriteSerializer(
-                data={'user': request.user.id, 'following': following.id},
-                context={"request": request}
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
+                subscription, context={'request': request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        subscription = Subscribe.objects.filter(
-            user=user, following=following
-        )
-        if subscription.exists():
-            subscription.delete()
+        result = remove_relation(
+            request.user, Subscribe, 'following', following_id)
+        if result == NOT_FOUND:
+            raise not_found(User)
+        if result == REMOVED:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(data={
             'errors': 'Невозможно удалить. '
@@ -52,14 +83,43 @@ class UserViewSet(BaseUserViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    @action(detail=False,
+            methods=['post', 'delete'],
+            url_path='subscribe',
+            permission_classes=[permissions.IsAuthenticated])
+    def subscribe_batch(self, request, **kwargs):
+        ids = get_batch_ids(request)
+        if request.method == 'POST':
+            results = add_in_bulk(
+                request.user, Subscribe, 'following', User.objects, ids,
+                excluded_ids={request.user.id}
+            )
+        else:
+            results = remove_in_bulk(request.user, Subscribe, 'following', ids)
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
     @action(detail=False,
             methods=['get'],
             serializer_class=serializers.SubscribeReadSerializer,
+            pagination_class=SubscriptionPagination,
             permission_classes=[permissions.IsAuthenticated])
     def subscriptions(self, request, **kwargs):
         user = request.user
-        subscriptions = User.objects.filter(followings__user=user).order_by(
-            'username')
+        recipes = models.Recipe.objects.annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=F('author'),
+                order_by=F('id').desc()
+            )
+        )
+        recipes_limit = request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.filter(row_number__lte=int(recipes_limit))
+        subscriptions = User.objects.filter(followings__user=user).annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='latest_recipes')
+        ).order_by('username')
         page = self.paginate_queryset(subscriptions)
         serializer = self.get_serializer(instance=page, many=True)
         return self.get_paginated_response(serializer.data)
@@ -83,24 +143,124 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = serializers.TagSerializer
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        tags = tag_cache.get()
+        return conditional_response(
+            request, tags.etag, lambda: Response(tags.data)
+        )
+
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = models.Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        etag = make_etag(
+            ingredient_index.get_etag(), request.get_full_path()
+        )
+        return conditional_response(request, etag, self.get_ingredients)
+
+    def get_ingredients(self):
+        limit = self.request.query_params.get('limit')
+        ingredients = ingredient_index.search(
+            self.request.query_params.get('name'),
+            int(limit) if limit and limit.isdigit() else None
+        )
+        serializer = self.get_serializer(ingredients, many=True)
+        return Response(serializer.data)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = models.Recipe.objects.prefetch_related(
-        'ingredients', 'tags').select_related(
-        'author')
+    queryset = models.Recipe.objects.all()
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    pagination_class = RecipePagination
     http_method_names = ['get', 'post', 'patch', 'delete']
     permission_classes = (IsAuthenticatedOrAuthor,)
 
+    def get_queryset(self):
+        user = self.request.user
+        if user.is_anonymous:
+            return self.queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField())
+            )
+        return self.queryset.annotate(
+            is_favorited=Exists(models.Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(models.ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')))
+        )
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset()))
+        etag = make_etag(
+            request.get_full_path(),
+            request.user.id,
+            get_viewer_fingerprint(request.user),
+            None if self.paginator.keyset_paginator
+            else self.paginator.page.paginator.count,
+            *((recipe.id, recipe.updated_at) for recipe in page)
+        )
+        return conditional_response(
+            request, etag,
+            lambda: self.get_paginated_response(self.get_recipe_cards(page))
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe = self.get_object()
+        followed_ids = serializers.load_followed_ids(request.user)
+        etag = make_etag(
+            recipe.id,
+            recipe.updated_at,
+            request.user.id,
+            recipe.is_favorited,
+            recipe.is_in_shopping_cart,
+            recipe.author_id in followed_ids
+        )
+        return conditional_response(
+            request, etag,
+            lambda: Response(
+                self.get_recipe_cards([recipe], followed_ids)[0]),
+            recipe.updated_at
+        )
+
+    def get_recipe_cards(self, recipes, followed_ids=None):
+        cards = recipe_card_cache.get_many(recipes)
+        missing_ids = [
+            recipe.id for recipe in recipes if recipe.id not in cards
+        ]
+        if missing_ids:
+            missing = list(self.get_queryset().filter(
+                id__in=missing_ids
+            ).select_related('author').prefetch_related(
+                Prefetch(
+                    'ingredienttorecipe_set',
+                    queryset=models.IngredientToRecipe.objects.select_related(
+                        'ingredient')
+                ),
+                'tags'
+            ))
+            serializer = serializers.RecipeReadSerializer(
+                missing,
+                many=True,
+                context={'request': None, 'followed_ids': set()}
+            )
+            new_cards = {
+                data['id']: make_card(data) for data in serializer.data
+            }
+            recipe_card_cache.set_many(missing, new_cards)
+            cards.update(new_cards)
+        if followed_ids is None:
+            followed_ids = serializers.load_followed_ids(self.request.user)
+        return [
+            apply_viewer_fields(
+                cards[recipe.id], recipe, followed_ids, self.request
+            ) for recipe in recipes
+        ]
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -115,12 +275,12 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[permissions.IsAuthenticated]
     )
     def favorite(self, request, pk):
-        user = request.user
         if request.method == 'POST':
             return self.adding(
-                request, pk,
-                serializers.FavoriteSerializer)
-        return self.deleting(pk, user, models.Favorite)
+                request, pk, models.Favorite,
+                serializers.FavoriteSerializer,
+                'Рецепт уже добавлен в избранное.')
+        return self.deleting(request, pk, models.Favorite)
 
     @action(
         detail=True,
@@ -128,37 +288,60 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[permissions.IsAuthenticated]
     )
     def shopping_cart(self, request, pk):
-        user = request.user
         if request.method == 'POST':
             return self.adding(
-                request, pk,
-                serializers.ShoppingCartSerializer)
-        return self.deleting(pk, user, models.ShoppingCart)
+                request, pk, models.ShoppingCart,
+                serializers.ShoppingCartSerializer,
+                'Рецепт уже добавлен в список покупок.')
+        return self.deleting(request, pk, models.ShoppingCart)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite',
+        permission_classes=[permissions.IsAuthenticated]
+    )
+    def favorite_batch(self, request):
+        return self.changing_in_bulk(request, models.Favorite)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        permission_classes=[permissions.IsAuthenticated]
+    )
+    def shopping_cart_batch(self, request):
+        return self.changing_in_bulk(request, models.ShoppingCart)
 
-    def adding(self, request, pk, serializer_name):
-        if not models.Recipe.objects.filter(id=pk).exists():
+    def changing_in_bulk(self, request, model):
+        ids = get_batch_ids(request)
+        if request.method == 'POST':
+            results = add_in_bulk(
+                request.user, model, 'recipe', models.Recipe.objects, ids)
+        else:
+            results = remove_in_bulk(request.user, model, 'recipe', ids)
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    def adding(self, request, pk, model, serializer_class, duplicate_error):
+        relation, result = add_relation(request.user, model, 'recipe', pk)
+        if result == NOT_FOUND:
             return Response(
                 data={
                     'errors': 'Такой рецепт не существует.'
                 },
                 status=status.HTTP_400_BAD_REQUEST)
-        recipe = get_object_or_404(models.Recipe, id=pk)
-        serializer = serializer_name(
-            data={'user': request.user.id, 'recipe': recipe.id},
-            context={'request': request}
-        )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
+        if result == ALREADY_ADDED:
+            return Response(
+                data={'non_field_errors': [duplicate_error]},
+                status=status.HTTP_400_BAD_REQUEST)
+        serializer = serializer_class(relation, context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def deleting(self, pk, user, model_name):
-        recipe = get_object_or_404(models.Recipe, id=pk)
-        data = model_name.objects.filter(
-            user=user,
-            recipe=recipe
-        )
-        if data.exists():
-            data.delete()
+    def deleting(self, request, pk, model):
+        result = remove_relation(request.user, model, 'recipe', pk)
+        if result == NOT_FOUND:
+            raise not_found(models.Recipe)
+        if result == REMOVED:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
             data={
@@ -168,29 +351,61 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
     @action(detail=False,
-            methods=['get']
+            methods=['get'],
+            permission_classes=[permissions.IsAdminUser])
+    def cache_stats(self, request):
+        return Response(recipe_card_cache.get_stats())
+
+    def perform_content_negotiation(self, request, force=False):
+        if self.action == 'download_shopping_cart':
+            force = True
+        return super().perform_content_negotiation(request, force)
+
+    @action(detail=False,
+            methods=['get'],
+            pagination_class=StandardResultsSetPagination,
+            permission_classes=[permissions.IsAuthenticated])
+    def shopping_list(self, request):
+        items = models.ShoppingListItem.objects.filter(
+            user=request.user
+        ).select_related('ingredient').order_by(
+            'ingredient__name', 'ingredient__measurement_unit'
+        )
+        page = self.paginate_queryset(items)
+        serializer = serializers.ShoppingListItemSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False,
+            methods=['get'],
+            permission_classes=[permissions.IsAuthenticated]
             )
     def download_shopping_cart(self, request):
-        ingredients = models.IngredientToRecipe.objects.select_related(
-            'ingredient', 'recipe').filter(
-            recipe__shopping_carts__user=request.user
+        renderer = get_renderer(request.query_params.get('format', 'txt'))
+        if renderer is None:
+            return Response(
+                data={
+                    'errors': 'Неподдерживаемый формат. Доступные форматы: '
+                              f'{", ".join(SHOPPING_LIST_RENDERERS)}.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        ingredients = models.ShoppingListItem.objects.filter(
+            user=request.user
         ).values(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            ingredient_amount=F('total_amount')
+        ).order_by(
             'ingredient__name',
             'ingredient__measurement_unit'
-        ).annotate(ingredient_amount=Sum('amount'))
-        current_date = timezone.now().date()
-        shopping_cart = (f'Список покупок: {request.user.first_name} '
-                         f'{request.user.last_name}, '
-                         f'{current_date.strftime("%d.%m.%Y")} \n\n')
-        for ingredient in ingredients:
-            shopping_cart += (
-                f'{ingredient["ingredient__name"]} '
-                f'({ingredient["ingredient__measurement_unit"]}) '
-                f'- {ingredient["ingredient_amount"]} \n'
-            )
-        shopping_cart += f'\nFoodgram {current_date.year}'
-        filename = (f'{request.user.first_name}_{request.user.last_name}'
-                    f'_shopping_cart.txt')
-        response = HttpResponse(shopping_cart, content_type='text/plain')
-        response['Content-Disposition'] = f'attachment; filename={filename}'
+        )
+        response = StreamingHttpResponse(
+            renderer.render(
+                request.user,
+                timezone.now().date(),
+                ingredients.iterator()
+            ),
+            content_type=renderer.content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename={renderer.get_filename(request.user)}')
         return response
@@ -0,0 +1,70 @@
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+
+class CounterModel(models.Model):
+    counters = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if adding:
+                self.change_counters(1)
+
+    def change_counters(self, delta):
+        for name, counter in self.counters:
+            change_counter(
+                self._meta.get_field(name).related_model.objects.filter(
+                    pk=getattr(self, f'{name}_id')
+                ),
+                counter, delta
+            )
+
+    @classmethod
+    def change_counters_in_bulk(cls, objs, delta):
+        for name, counter in cls.counters:
+            targets = Counter(getattr(obj, f'{name}_id') for obj in objs)
+            for times in set(targets.values()):
+                change_counter(
+                    cls._meta.get_field(name).related_model.objects.filter(
+                        pk__in=[
+                            pk for pk, total in targets.items()
+                            if total == times
+                        ]
+                    ),
+                    counter, delta * times
+                )
+
+
+class CounterFieldsModel(models.Model):
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and not args
+                and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+def change_counter(queryset, counter, delta):
+    if delta > 0:
+        queryset.update(**{counter: F(counter) + delta})
+    elif delta < 0:
+        queryset.update(**{counter: Greatest(F(counter) + delta, 0)})
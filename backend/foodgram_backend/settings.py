@@ -81,6 +81,19 @@ else:
         }
     }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+        }
+    }
+}
+
+PAGINATION_ESTIMATE_COUNT_THRESHOLD = int(
+    os.getenv('PAGINATION_ESTIMATE_COUNT_THRESHOLD', 0)
+)
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -114,6 +127,12 @@ STATIC_ROOT = '/backend_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/media'
 
+FILE_UPLOAD_HANDLERS = [
+    'recipes.uploadhandlers.LimitedTemporaryFileUploadHandler',
+]
+
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
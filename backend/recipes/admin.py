@@ -18,10 +18,10 @@ class IngredientAdmin(admin.ModelAdmin):
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('name', 'author', 'all_tags', 'get_favorite_count')
     list_filter = ('name', 'author', 'tags')
-    readonly_fields = ('get_favorite_count',)
+    readonly_fields = ('get_favorite_count', 'in_carts_count')
 
     def get_favorite_count(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
     get_favorite_count.short_description = 'Кол-во добавлений в избранное'
 
@@ -39,3 +39,8 @@ class FavoriteAdmin(admin.ModelAdmin):
 @admin.register(models.ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe')
+
+
+@admin.register(models.ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ingredient', 'total_amount')
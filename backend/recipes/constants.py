@@ -3,3 +3,14 @@ SLUG_LENGTH = 200
 MEASUREMENT_UNIT_LENGTH = 200
 COLOR_LENGTH = 7
 MAX_SHOWING_LENGTH = 20
+IMAGE_VARIANT_SIZES = (320, 640)
+IMAGE_VARIANT_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_SIDE = 8000
+IMAGE_MAX_PIXELS = 40_000_000
+BASE64_CHUNK_SIZE = 64 * 1024
+SEARCH_CONFIG = 'russian'
+SEARCH_FTS_TABLE = 'recipes_recipe_fts'
+SEARCH_NAME_WEIGHT = 10.0
+SEARCH_TEXT_WEIGHT = 1.0
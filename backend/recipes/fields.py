@@ -1,13 +1,77 @@
-import base64
+import binascii
 
-from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image
 from rest_framework import serializers
 
+from .constants import (BASE64_CHUNK_SIZE, IMAGE_MAX_PIXELS, IMAGE_MAX_SIDE,
+                        IMAGE_MAX_SIZE)
+from .storage import recipe_image_storage
+
+BASE64_SEPARATOR = ';base64,'
+
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'invalid_base64': 'Некорректные данные изображения в base64.',
+        'too_large': 'Размер изображения не должен превышать {max_size} Мб.',
+        'too_big': 'Размер изображения не должен превышать '
+                   '{max_side}x{max_side} пикселей.',
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = self.decode_base64(data)
+        self.validate_header(data)
         return super().to_internal_value(data)
+
+    def decode_base64(self, data):
+        start = data.find(BASE64_SEPARATOR)
+        if start == -1:
+            self.fail('invalid_base64')
+        ext = data[len('data:image/'):start]
+        start += len(BASE64_SEPARATOR)
+        if (len(data) - start) // 4 * 3 > IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=IMAGE_MAX_SIZE // 1024 // 1024)
+        file = TemporaryUploadedFile(
+            'temp.' + ext, 'image/' + ext, 0, None)
+        try:
+            for position in range(start, len(data), BASE64_CHUNK_SIZE):
+                file.write(binascii.a2b_base64(
+                    data[position:position + BASE64_CHUNK_SIZE]))
+        except binascii.Error:
+            file.close()
+            self.fail('invalid_base64')
+        file.size = file.tell()
+        file.seek(0)
+        return file
+
+    def validate_header(self, data):
+        if getattr(data, 'size', None) is None:
+            return
+        if data.size > IMAGE_MAX_SIZE:
+            self.fail('too_large', max_size=IMAGE_MAX_SIZE // 1024 // 1024)
+        try:
+            with Image.open(data) as image:
+                width, height = image.size
+        except (OSError, Image.DecompressionBombError):
+            self.fail('invalid_image')
+        finally:
+            data.seek(0)
+        if (max(width, height) > IMAGE_MAX_SIDE
+                or width * height > IMAGE_MAX_PIXELS):
+            self.fail('too_big', max_side=IMAGE_MAX_SIDE)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    def to_representation(self, value):
+        request = self.context.get('request')
+        representation = {}
+        for size, formats in value.get('sizes', {}).items():
+            representation[size] = {}
+            for extension, name in formats.items():
+                url = recipe_image_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                representation[size][extension] = url
+        return representation
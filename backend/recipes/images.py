@@ -0,0 +1,93 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.utils import timezone
+from PIL import Image
+
+from . import constants
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+executor = None
+
+
+def get_variant_name(size, extension):
+    return os.path.join(
+        Recipe._meta.get_field('image').upload_to, 'variants',
+        f'{size}.{extension}'
+    ).replace(os.sep, '/')
+
+
+def render_variant(image, size, image_format):
+    variant = image.copy()
+    variant.thumbnail((size, size))
+    if image_format == 'JPEG' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+    elif variant.mode not in ('RGB', 'RGBA'):
+        variant = variant.convert('RGBA')
+    buffer = BytesIO()
+    variant.save(
+        buffer, image_format, quality=constants.IMAGE_VARIANT_QUALITY
+    )
+    return buffer.getvalue()
+
+
+def generate_variants(field_file):
+    with field_file.open('rb') as source:
+        image = Image.open(source)
+        image.load()
+    storage = field_file.storage
+    sizes = {}
+    for size in constants.IMAGE_VARIANT_SIZES:
+        sizes[str(size)] = {}
+        for extension, image_format in (
+            constants.IMAGE_VARIANT_FORMATS.items()
+        ):
+            sizes[str(size)][extension] = storage.save(
+                get_variant_name(size, extension),
+                ContentFile(render_variant(image, size, image_format))
+            )
+    return {'source': field_file.name, 'sizes': sizes}
+
+
+def build_recipe_variants(recipe_id, image_name):
+    variants = generate_variants(Recipe(id=recipe_id, image=image_name).image)
+    Recipe.objects.filter(id=recipe_id, image=image_name).update(
+        image_variants=variants, updated_at=timezone.now()
+    )
+    return variants
+
+
+def needs_variants(recipe):
+    return bool(recipe.image) and (
+        recipe.image_variants.get('source') != recipe.image.name
+    )
+
+
+def run_in_worker(recipe_id, image_name):
+    try:
+        build_recipe_variants(recipe_id, image_name)
+    except Exception:
+        logger.exception(
+            'Не удалось создать копии изображения рецепта %s', recipe_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(recipe):
+    global executor
+    if settings.RECIPE_IMAGE_WORKERS < 1:
+        build_recipe_variants(recipe.id, recipe.image.name)
+        return
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=settings.RECIPE_IMAGE_WORKERS,
+            thread_name_prefix='recipe-images'
+        )
+    executor.submit(run_in_worker, recipe.id, recipe.image.name)
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.11 on 2026-10-18 06:23
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(default=None, null=True, storage=recipes.storage.get_recipe_image_storage, upload_to='recipes/images/', verbose_name='Изображение рецепта'),
+        ),
+    ]
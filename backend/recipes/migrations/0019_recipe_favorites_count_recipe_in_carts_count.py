@@ -0,0 +1,51 @@
+# Generated by Django 4.2.11 on 2026-10-18 06:25
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes', 'Recipe', 'favorites_count', 'recipes', 'Favorite', 'recipe'),
+    ('recipes', 'Recipe', 'in_carts_count',
+     'recipes', 'ShoppingCart', 'recipe'),
+    ('users', 'User', 'recipes_count', 'recipes', 'Recipe', 'author'),
+    ('users', 'User', 'followers_count', 'users', 'Subscribe', 'following'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for (app_label, model_name, counter,
+         related_app_label, related_model_name, field) in COUNTERS:
+        related_model = apps.get_model(related_app_label, related_model_name)
+        apps.get_model(app_label, model_name).objects.update(**{
+            counter: Coalesce(Subquery(
+                related_model.objects.filter(
+                    **{field: OuterRef('pk')}
+                ).order_by().values(field).annotate(
+                    total=Count('pk')
+                ).values('total'),
+                output_field=IntegerField()
+            ), 0)
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_recipe_image_storage'),
+        ('users', '0007_user_followers_count_user_recipes_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество добавлений в список покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.11 on 2026-10-18 07:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0021_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchEntry',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'запись поискового индекса',
+                'verbose_name_plural': 'записи поискового индекса',
+                'db_table': 'recipes_recipe_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -3,7 +3,10 @@ from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
 
+from core.models import CounterFieldsModel, CounterModel
+
 from . import constants
+from .storage import get_recipe_image_storage
 
 User = get_user_model()
 
@@ -71,7 +74,7 @@ class Ingredient(NameBaseModel):
         return self.name[:constants.MAX_SHOWING_LENGTH]
 
 
-class Recipe(NameBaseModel):
+class Recipe(NameBaseModel, CounterFieldsModel, CounterModel):
     ingredients = models.ManyToManyField(
         Ingredient,
         through='IngredientToRecipe',
@@ -84,10 +87,17 @@ class Recipe(NameBaseModel):
     )
     image = models.ImageField(
         upload_to='recipes/images/',
+        storage=get_recipe_image_storage,
         null=True,
         default=None,
         verbose_name='Изображение рецепта'
     )
+    image_variants = models.JSONField(
+        'Уменьшенные копии изображения',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     text = models.TextField(
         'Описание'
     )
@@ -101,6 +111,28 @@ class Recipe(NameBaseModel):
         verbose_name='Автор',
         related_name='recipes'
     )
+    favorites_count = models.PositiveIntegerField(
+        'Количество добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'Количество добавлений в список покупок',
+        default=0,
+        editable=False
+    )
+    created_at = models.DateTimeField(
+        'Дата создания',
+        auto_now_add=True
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
+
+    counters = (('author', 'recipes_count'),)
+    counter_fields = ('favorites_count', 'in_carts_count')
 
     class Meta:
         ordering = ('-id',)
@@ -205,7 +237,8 @@ class UserBaseModel(models.Model):
         abstract = True
 
 
-class Favorite(RecipeBaseModel, UserBaseModel):
+class Favorite(RecipeBaseModel, UserBaseModel, CounterModel):
+    counters = (('recipe', 'favorites_count'),)
 
     class Meta:
         ordering = ('user',)
@@ -224,7 +257,8 @@ class Favorite(RecipeBaseModel, UserBaseModel):
                 f'{self.recipe.name[:constants.MAX_SHOWING_LENGTH]}')
 
 
-class ShoppingCart(RecipeBaseModel, UserBaseModel):
+class ShoppingCart(RecipeBaseModel, UserBaseModel, CounterModel):
+    counters = (('recipe', 'in_carts_count'),)
 
     class Meta:
         ordering = ('user',)
@@ -241,3 +275,45 @@ class ShoppingCart(RecipeBaseModel, UserBaseModel):
     def __str__(self):
         return (f'{self.user.username[:constants.MAX_SHOWING_LENGTH]} - '
                 f'{self.recipe.name[:constants.MAX_SHOWING_LENGTH]}')
+
+
+class ShoppingListItem(UserBaseModel):
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.PositiveIntegerField('Общее количество')
+
+    class Meta:
+        ordering = ('user', 'ingredient')
+        verbose_name = 'ингредиент в списке покупок'
+        verbose_name_plural = 'ингредиенты в списке покупок'
+        default_related_name = 'shopping_list_items'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_ingredient_shopping_list'
+            )
+        ]
+
+    def __str__(self):
+        return (f'{self.user.username[:constants.MAX_SHOWING_LENGTH]} - '
+                f'{self.ingredient.name[:constants.MAX_SHOWING_LENGTH]}')
+
+
+class RecipeSearchEntry(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_entry',
+        verbose_name='Рецепт'
+    )
+
+    class Meta:
+        managed = False
+        db_table = constants.SEARCH_FTS_TABLE
+        verbose_name = 'запись поискового индекса'
+        verbose_name_plural = 'записи поискового индекса'
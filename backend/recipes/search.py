@@ -0,0 +1,88 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from .constants import (SEARCH_CONFIG, SEARCH_FTS_TABLE, SEARCH_NAME_WEIGHT,
+                        SEARCH_TEXT_WEIGHT)
+
+WORD_PATTERN = re.compile(r'\w+')
+
+SQLITE_TRIGGERS = {
+    f'{SEARCH_FTS_TABLE}_insert': (
+        'AFTER INSERT ON recipes_recipe BEGIN '
+        f'INSERT INTO {SEARCH_FTS_TABLE}(rowid, name, text) '
+        'VALUES (new.id, new.name, new.text); END'
+    ),
+    f'{SEARCH_FTS_TABLE}_delete': (
+        'AFTER DELETE ON recipes_recipe BEGIN '
+        f'INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, name, '
+        "text) VALUES ('delete', old.id, old.name, old.text); END"
+    ),
+    f'{SEARCH_FTS_TABLE}_update': (
+        'AFTER UPDATE OF name, text ON recipes_recipe BEGIN '
+        f'INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}, rowid, name, '
+        "text) VALUES ('delete', old.id, old.name, old.text); "
+        f'INSERT INTO {SEARCH_FTS_TABLE}(rowid, name, text) '
+        'VALUES (new.id, new.name, new.text); END'
+    ),
+}
+
+
+def ensure_search_triggers(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s)" % ', '.join(
+                ['%s'] * (len(SQLITE_TRIGGERS) + 1)
+            ),
+            [SEARCH_FTS_TABLE, *SQLITE_TRIGGERS]
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        if SEARCH_FTS_TABLE not in existing:
+            return
+        if existing.issuperset(SQLITE_TRIGGERS):
+            return
+        for name, body in SQLITE_TRIGGERS.items():
+            if name not in existing:
+                cursor.execute(f'CREATE TRIGGER {name} {body}')
+        cursor.execute(
+            f'INSERT INTO {SEARCH_FTS_TABLE}({SEARCH_FTS_TABLE}) '
+            "VALUES ('rebuild')"
+        )
+
+
+def search_recipes(queryset, value):
+    words = WORD_PATTERN.findall(value)
+    if not words:
+        return queryset.none()
+    if connections[queryset.db].vendor == 'postgresql':
+        queryset = search_postgresql(queryset, value)
+    else:
+        queryset = search_sqlite(queryset, words)
+    return queryset.order_by('-search_rank', '-id')
+
+
+def search_postgresql(queryset, value):
+    table = queryset.model._meta.db_table
+    query = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+    return queryset.filter(RawSQL(
+        f'{table}.search_vector @@ {query}', (value,),
+        output_field=BooleanField()
+    )).annotate(search_rank=RawSQL(
+        f'ts_rank({table}.search_vector, {query})', (value,),
+        output_field=FloatField()
+    ))
+
+
+def search_sqlite(queryset, words):
+    return queryset.filter(search_entry__isnull=False).filter(RawSQL(
+        f'{SEARCH_FTS_TABLE} MATCH %s',
+        (' '.join(f'"{word}"*' for word in words),),
+        output_field=BooleanField()
+    )).annotate(search_rank=RawSQL(
+        f'-bm25({SEARCH_FTS_TABLE}, {SEARCH_NAME_WEIGHT}, '
+        f'{SEARCH_TEXT_WEIGHT})', (), output_field=FloatField()
+    ))
@@ -0,0 +1,33 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        hexdigest = digest.hexdigest()
+        return os.path.join(
+            directory, hexdigest[:2], hexdigest + extension
+        ).replace(os.sep, '/')
+
+    def _save(self, name, content):
+        name = self.get_content_name(name, content)
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return super()._save(name, content)
+        return name
+
+
+recipe_image_storage = ContentAddressedStorage()
+
+
+def get_recipe_image_storage():
+    return recipe_image_storage
@@ -0,0 +1,20 @@
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+from .constants import IMAGE_MAX_SIZE
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > IMAGE_MAX_SIZE:
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.size = self.received
+        return file
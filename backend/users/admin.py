@@ -6,7 +6,8 @@ from .models import Subscribe, User
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
-    list_display = ('id', 'username', 'email', 'first_name', 'last_name')
+    list_display = ('id', 'username', 'email', 'first_name', 'last_name',
+                    'recipes_count', 'followers_count')
     list_filter = ('email', 'username')
 
 
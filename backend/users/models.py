@@ -1,12 +1,15 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from core.models import CounterFieldsModel, CounterModel
+
 from .constants import EMAIL_LENGHT, NAME_LENGTH
 
 
-class User(AbstractUser):
+class User(AbstractUser, CounterFieldsModel):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
+    counter_fields = ('recipes_count', 'followers_count')
 
     email = models.EmailField(
         'Адрес электронной почты',
@@ -24,9 +27,19 @@ class User(AbstractUser):
         max_length=NAME_LENGTH,
         blank=False
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+        editable=False
+    )
 
 
-class Subscribe(models.Model):
+class Subscribe(CounterModel):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -38,6 +51,8 @@ class Subscribe(models.Model):
         verbose_name='На кого подписан',
         related_name='followings')
 
+    counters = (('following', 'followers_count'),)
+
     class Meta:
         ordering = ('following',)
         verbose_name = 'подписывание'